@@ -1,14 +1,51 @@
 """
     Browser module
 """
-from .browser import Browser
-from .browseroptions import BrowserOptions
-from .log import setup_logging
-from .weblogger import WebLogger
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .browser import Browser
+    from .browseroptions import BrowserOptions
+    from .log import setup_logging
+    from .platforminfo import PlatformInfo
+    from .weblogger import WebLogger
+
+# Public names mapped onto modules providing them. Modules are imported on first attribute access only, so tools
+# that need e.g. setup_logging() do not pay for importing Selenium or requests.
+_LAZY_EXPORTS = {
+    "Browser": ".browser",
+    "BrowserOptions": ".browseroptions",
+    "PlatformInfo": ".platforminfo",
+    "WebLogger": ".weblogger",
+    "setup_logging": ".log",
+}
 
 __all__ = [
     "Browser",
     "BrowserOptions",
+    "PlatformInfo",
     "WebLogger",
     "setup_logging"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Import a public name on first use and cache it in module globals
+    :param name: attribute name
+    :return: attribute value
+    """
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """
+        Return module attributes, including the lazily imported ones.
+    """
+    return sorted(set(globals()) | set(__all__))
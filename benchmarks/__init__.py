@@ -0,0 +1,3 @@
+"""
+    Browser module benchmarks
+"""
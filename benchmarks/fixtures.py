@@ -0,0 +1,190 @@
+"""
+    Local HTTP server for benchmark fixture pages
+"""
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep
+from types import TracebackType
+from typing import Any
+
+
+@dataclass
+class Fixture:
+    """
+    Single served resource
+    """
+    body: str | bytes
+    content_type: str = 'text/html; charset=utf-8'
+    # response delay in seconds
+    delay: float = 0.0
+
+
+class FixtureServer:
+    """
+    Serve fixtures on a random local port, in a background thread, for the lifetime of the context manager
+    """
+
+    def __init__(self, fixtures: dict[str, Fixture]) -> None:
+        """
+        Class constructor
+        :param fixtures: fixtures by URL path, e.g. '/index.html'
+        """
+        self.fixtures = fixtures
+        self._server: ThreadingHTTPServer | None = None
+
+    def __enter__(self) -> 'FixtureServer':
+        """
+            Start the server.
+        """
+        fixtures = self.fixtures
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+                Fixture request handler.
+            """
+
+            def do_GET(self) -> None:
+                """
+                    Serve a fixture, honoring its delay.
+                """
+                fixture = fixtures.get(self.path.split('?')[0])
+                if fixture is None:
+                    self.send_error(404)
+                    return
+                sleep(fixture.delay)
+                body = fixture.body.encode('utf-8') if isinstance(fixture.body, str) else fixture.body
+                self.send_response(200)
+                self.send_header('Content-Type', fixture.content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                """
+                    Keep benchmark output clean.
+                """
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc_val: BaseException | None,
+                 exc_tb: TracebackType | None) -> None:
+        """
+            Stop the server.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def url(self, path: str) -> str:
+        """
+        :param path: fixture path
+        :return: full fixture URL
+        """
+        assert self._server is not None, 'Server is not running'
+        return f'http://127.0.0.1:{self._server.server_address[1]}{path}'
+
+
+def svg_image(index: int) -> Fixture:
+    """
+    :param index: image number, changes the image color
+    :return: small SVG image fixture
+    """
+    return Fixture(f'<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64">'
+                   f'<rect width="64" height="64" fill="#{index * 2654435761 % 0xFFFFFF:06x}"/></svg>',
+                   'image/svg+xml')
+
+
+def static_page(nodes: int = 2000, images: int = 20) -> dict[str, Fixture]:
+    """
+    Page with a large static DOM tree and a number of images
+    :param nodes: number of list items
+    :param images: number of images
+    :return: fixtures, the page is served as '/static.html'
+    """
+    items = ''.join(f'<li class="item"><b>Item {index}</b> <span>lorem ipsum dolor sit amet</span></li>'
+                    for index in range(nodes))
+    pictures = ''.join(f'<img src="/img/{index}.svg" width="64" height="64">' for index in range(images))
+    fixtures = {'/static.html': Fixture(f'<!doctype html><html><head><title>static</title></head>'
+                                        f'<body><ul>{items}</ul>{pictures}</body></html>')}
+    fixtures.update({f'/img/{index}.svg': svg_image(index) for index in range(images)})
+    return fixtures
+
+
+def script_page(nodes: int = 500) -> dict[str, Fixture]:
+    """
+    Page building its DOM with JavaScript
+    :param nodes: number of elements created
+    :return: fixtures, the page is served as '/script.html'
+    """
+    return {'/script.html': Fixture(f'''<!doctype html><html><head><title>script</title></head><body>
+<div id="root"></div>
+<script>
+  const root = document.getElementById('root');
+  for (let i = 0; i < {nodes}; i++) {{
+    const div = document.createElement('div');
+    div.textContent = 'Generated ' + i + ' ' + Math.sqrt(i).toFixed(4);
+    root.appendChild(div);
+  }}
+</script></body></html>''')}
+
+
+# Marks the moment a page is actually ready, as Unix epoch milliseconds comparable with time.time() * 1000
+_MARK_READY = 'window.__readyAt = performance.timeOrigin + performance.now();'
+_TARGET = '<button id="target" style="position:relative;z-index:1">Target</button>'
+
+
+def wait_pages(delay: float = 1.5) -> dict[str, Fixture]:
+    """
+    Pages with scripted behavior for wait primitive benchmarks. Every page contains a '#target' button and sets
+    'window.__readyAt' once it is really ready.
+    :param delay: duration of the scripted activity, in seconds
+    :return: fixtures, pages are served as '/delayed-xhr.html', '/dom-churn.html', '/late-overlay.html' and
+        '/slow-images.html'
+    """
+    delay_ms = int(delay * 1000)
+    fixtures = {
+        # content rendered after a slow XHR response
+        '/delayed-xhr.html': Fixture(f'''<!doctype html><html><body><div id="content">loading</div>{_TARGET}
+<script>
+  fetch('/api/data').then(response => response.json()).then(data => {{
+    document.getElementById('content').textContent = data.message;
+    {_MARK_READY}
+  }});
+</script></body></html>'''),
+        '/api/data': Fixture('{"message": "loaded"}', 'application/json', delay),
+        # DOM changing continuously until the page settles
+        '/dom-churn.html': Fixture(f'''<!doctype html><html><body><div id="ticker"></div>{_TARGET}
+<script>
+  const started = performance.now();
+  const timer = setInterval(() => {{
+    document.getElementById('ticker').textContent = 'tick ' + performance.now();
+    if (performance.now() - started > {delay_ms}) {{
+      clearInterval(timer);
+      {_MARK_READY}
+    }}
+  }}, 50);
+</script></body></html>'''),
+        # target covered by an overlay which disappears later
+        '/late-overlay.html': Fixture(f'''<!doctype html><html><body>{_TARGET}
+<div id="overlay" style="position:fixed;inset:0;background:rgba(0,0,0,.5);z-index:10"></div>
+<script>
+  setTimeout(() => {{
+    document.getElementById('overlay').remove();
+    {_MARK_READY}
+  }}, {delay_ms});
+</script></body></html>'''),
+    }
+    images = ''.join(f'<img src="/slow/{index}.svg" width="64" height="64">' for index in range(6))
+    # images served slowly, page ready at the load event
+    fixtures['/slow-images.html'] = Fixture(f'''<!doctype html><html><body>{_TARGET}{images}
+<script>window.addEventListener('load', () => {{ {_MARK_READY} }});</script></body></html>''')
+    for index in range(6):
+        image = svg_image(index)
+        image.delay = delay
+        fixtures[f'/slow/{index}.svg'] = image
+    return fixtures
@@ -0,0 +1,74 @@
+"""
+    chrome-headless-shell versus full headless Chrome benchmark: launch time, page load time and process tree RSS
+
+    Usage: python -m browser.benchmarks.headlessshell [--runs N] [--json FILE]
+"""
+import argparse
+import json
+import statistics
+import sys
+from time import monotonic
+from typing import Any
+
+from ..browser import Browser
+from ..browseroptions import BrowserOptions
+from ..procstats import process_tree, rss_bytes
+from .fixtures import FixtureServer, script_page, static_page
+from .launchflags import PACKAGE_DIR
+
+
+def measure(headless_shell: bool, server: FixtureServer, root_path: str) -> dict[str, Any]:
+    """
+    Launch a headless browser, load all fixture pages and quit
+    :param headless_shell: prefer chrome-headless-shell to full Chrome
+    :param server: running fixture server
+    :param root_path: BrowserOptions root path
+    :return: binary used, launch time, total page load time (in seconds) and peak RSS (in MiB)
+    """
+    options = BrowserOptions(root_path, headless=True, save_trace_logs=False, chrome_path='',
+                             headless_shell=headless_shell)
+    start = monotonic()
+    browser = Browser(options)
+    launch = monotonic() - start
+    try:
+        load = 0.0
+        peak_rss = 0
+        for path in ('/static.html', '/script.html', '/static.html'):
+            start = monotonic()
+            browser.get(server.url(path))
+            load += monotonic() - start
+            peak_rss = max(peak_rss, rss_bytes(process_tree(browser.service.process.pid)))
+    finally:
+        browser.quit()
+    return {'chrome': options.chrome_location, 'launch_s': launch, 'load_s': load, 'rss_mib': peak_rss / 2 ** 20}
+
+
+def main() -> int:
+    """
+    Run the benchmark
+    :return: process exit code
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3, help='number of measured runs per binary')
+    parser.add_argument('--root-path', default=str(PACKAGE_DIR), help='BrowserOptions root path')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results: dict[str, Any] = {}
+    fixtures = {**static_page(), **script_page()}
+    with FixtureServer(fixtures) as server:
+        for name, headless_shell in (('chrome --headless', False), ('chrome-headless-shell', True)):
+            samples = [measure(headless_shell, server, args.root_path) for _ in range(args.runs)]
+            results[name] = {key: statistics.median(sample[key] for sample in samples)
+                             for key in ('launch_s', 'load_s', 'rss_mib')}
+            results[name]['chrome'] = samples[0]['chrome']
+            print(f'{name:<25} launch={results[name]["launch_s"]:6.3f}s  load={results[name]["load_s"]:6.3f}s  '
+                  f'rss={results[name]["rss_mib"]:7.1f} MiB  ({results[name]["chrome"]})')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as json_file:
+            json.dump(results, json_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+    Package import time benchmark based on 'python -X importtime'
+
+    Usage: python -m browser.benchmarks.importtime [--max-ms MS] [--runs N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).resolve().parents[1]
+PACKAGE_NAME = PACKAGE_DIR.name
+
+# Modules that must not be loaded by a bare package import
+HEAVY_MODULES = ('selenium', 'requests', 'str_to_bool')
+
+
+def measure_import(statement: str) -> tuple[float, set[str]]:
+    """
+    Import the package in a fresh interpreter with '-X importtime' enabled
+    :param statement: Python statement to execute
+    :return: cumulative import time of the package in milliseconds and set of imported top-level modules
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(PACKAGE_DIR.parent), env.get('PYTHONPATH')]))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            env=env, capture_output=True, text=True, check=True)
+    cumulative_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = (field.strip() for field in line[len('import time:'):].split('|'))
+        if not cumulative.isdigit():
+            continue
+        modules.add(name.split('.')[0])
+        if name == PACKAGE_NAME:
+            cumulative_us = max(cumulative_us, int(cumulative))
+    return cumulative_us / 1000, modules
+
+
+def main() -> int:
+    """
+    Run the benchmark
+    :return: process exit code, non-zero if a regression was detected
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-ms', type=float, default=50.0, help='maximum accepted median import time')
+    parser.add_argument('--runs', type=int, default=5, help='number of measured runs')
+    args = parser.parse_args()
+
+    statements = {
+        'package': f'import {PACKAGE_NAME}',
+        'setup_logging': f'from {PACKAGE_NAME} import setup_logging',
+        'PlatformInfo': f'from {PACKAGE_NAME} import PlatformInfo',
+    }
+    failed = False
+    for label, statement in statements.items():
+        samples = []
+        modules: set[str] = set()
+        for _ in range(args.runs):
+            elapsed, modules = measure_import(statement)
+            samples.append(elapsed)
+        median = sorted(samples)[len(samples) // 2]
+        heavy = sorted(modules.intersection(HEAVY_MODULES))
+        status = 'OK'
+        if median > args.max_ms or heavy:
+            status = 'FAIL'
+            failed = True
+        print(f'{label:<15} median={median:8.2f} ms  heavy modules={heavy or "-"}  {status}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
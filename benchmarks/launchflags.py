@@ -0,0 +1,78 @@
+"""
+    Chrome launch flag profile benchmark: launch time, page load time and process tree RSS per profile
+
+    Usage: python -m browser.benchmarks.launchflags [--profiles stealth lean-throughput ...] [--runs N] [--json FILE]
+"""
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+from time import monotonic
+from typing import Any
+
+from ..browser import Browser
+from ..browseroptions import BrowserOptions
+from ..flagprofiles import FlagProfile
+from ..procstats import process_tree, rss_bytes
+from .fixtures import FixtureServer, script_page, static_page
+
+PACKAGE_DIR = Path(__file__).resolve().parents[1]
+
+
+def measure(profiles: list[str], server: FixtureServer, root_path: str, chrome_path: str) -> dict[str, float]:
+    """
+    Launch a browser with the flag profiles provided, load all fixture pages and quit
+    :param profiles: flag profile names
+    :param server: running fixture server
+    :param root_path: BrowserOptions root path
+    :param chrome_path: Chrome path override
+    :return: launch time, total page load time (in seconds) and peak RSS (in MiB)
+    """
+    start = monotonic()
+    browser = Browser(BrowserOptions(root_path, headless=True, save_trace_logs=False, chrome_path=chrome_path,
+                                     flag_profiles=profiles))
+    launch = monotonic() - start
+    try:
+        load = 0.0
+        peak_rss = 0
+        for path in ('/static.html', '/script.html', '/static.html'):
+            start = monotonic()
+            browser.get(server.url(path))
+            load += monotonic() - start
+            peak_rss = max(peak_rss, rss_bytes(process_tree(browser.service.process.pid)))
+    finally:
+        browser.quit()
+    return {'launch_s': launch, 'load_s': load, 'rss_mib': peak_rss / 2 ** 20}
+
+
+def main() -> int:
+    """
+    Run the benchmark
+    :return: process exit code
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=[f'{profile}' for profile in FlagProfile],
+                        help='profiles to compare; join profiles with "+" to combine them, e.g. stealth+low-memory')
+    parser.add_argument('--runs', type=int, default=3, help='number of measured runs per profile')
+    parser.add_argument('--root-path', default=str(PACKAGE_DIR), help='BrowserOptions root path')
+    parser.add_argument('--chrome-path', default='', help='Chrome path override')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results: dict[str, Any] = {}
+    fixtures = {**static_page(), **script_page()}
+    with FixtureServer(fixtures) as server:
+        for name in args.profiles:
+            samples = [measure(name.split('+'), server, args.root_path, args.chrome_path) for _ in range(args.runs)]
+            results[name] = {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+            print(f'{name:<30} launch={results[name]["launch_s"]:6.3f}s  load={results[name]["load_s"]:6.3f}s  '
+                  f'rss={results[name]["rss_mib"]:7.1f} MiB')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as json_file:
+            json.dump(results, json_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+    Wait primitive latency benchmark: how long after a page is really ready does each Browser wait return,
+    and how many WebDriver round trips does it take
+
+    Usage: python -m browser.benchmarks.waits [--runs N] [--json FILE] [--baseline FILE]
+"""
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+from time import time
+from typing import Any, Callable
+
+from selenium.webdriver.common.by import By
+
+from ..browser import Browser
+from ..browseroptions import BrowserOptions
+from .fixtures import FixtureServer, wait_pages
+
+PACKAGE_DIR = Path(__file__).resolve().parents[1]
+PAGES = ('/delayed-xhr.html', '/dom-churn.html', '/late-overlay.html', '/slow-images.html')
+# Wait primitives measured, called right after the navigation has started
+WAITS: dict[str, Callable[[Browser], Any]] = {
+    'wait_for_page_load_completed': lambda browser: browser.wait_for_page_load_completed(),
+    'wait_for_page_stable': lambda browser: browser.wait_for_page_stable(1, 15),
+    'wait_for_page_inactive': lambda browser: browser.wait_for_page_inactive(15),
+    'wait_for_network_inactive': lambda browser: browser.wait_for_network_inactive(15),
+    'wait_for_element_clickable': lambda browser: browser.wait_for_element_clickable(By.ID, 'target', 15),
+}
+# Relative slowdown of a median gap reported as a regression when comparing with a baseline
+REGRESSION_TOLERANCE = 0.2
+
+
+class RoundTripCounter:
+    """
+    Counts WebDriver commands sent by a browser
+    """
+
+    def __init__(self, browser: Browser) -> None:
+        """
+            Wrap the browser's command execution.
+        """
+        self.count = 0
+        execute = browser.execute
+
+        def _counting_execute(*args: Any, **kwargs: Any) -> Any:
+            self.count += 1
+            return execute(*args, **kwargs)
+
+        # instance attribute shadows the method for this browser only
+        browser.execute = _counting_execute  # type: ignore[method-assign]
+
+
+def measure(browser: Browser, counter: RoundTripCounter, url: str, wait: Callable[[Browser], Any]) -> dict[str, Any]:
+    """
+    Start loading a page without waiting for it, run a wait primitive and compare its return with page readiness
+    :param browser: browser
+    :param counter: round trip counter of the browser
+    :param url: fixture page URL
+    :param wait: wait primitive
+    :return: gap between readiness and return in milliseconds (None if the wait returned before the page was
+        ready), and number of round trips
+    """
+    browser.get('about:blank')
+    browser.execute_cdp_cmd('Page.navigate', {'url': url})
+    counter.count = 0
+    wait(browser)
+    returned = time() * 1000
+    round_trips = counter.count
+    ready_at = browser._execute_javascript('return window.__readyAt || null')
+    # the page may set its ready time after the wait returned (and before the script above read it): premature too
+    premature = not ready_at or ready_at > returned
+    return {'gap_ms': None if premature else returned - ready_at, 'round_trips': round_trips}
+
+
+def summarize(samples: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    :param samples: measurements of a single page and wait primitive
+    :return: median gap, median round trips and number of premature returns
+    """
+    gaps = [sample['gap_ms'] for sample in samples if sample['gap_ms'] is not None]
+    return {
+        'gap_ms': statistics.median(gaps) if gaps else None,
+        'round_trips': statistics.median(sample['round_trips'] for sample in samples),
+        'premature': len(samples) - len(gaps),
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    """
+    :param results: current results
+    :param baseline: results of a reference run
+    :return: descriptions of regressions
+    """
+    regressions = []
+    for page, waits in results.items():
+        for name, current in waits.items():
+            reference = baseline.get(page, {}).get(name)
+            if reference is None:
+                continue
+            if current['premature'] > reference['premature']:
+                regressions.append(f'{page} {name}: returned before the page was ready more often')
+            if current['gap_ms'] is not None and reference['gap_ms'] is not None \
+                    and current['gap_ms'] > reference['gap_ms'] * (1 + REGRESSION_TOLERANCE) + 50:
+                regressions.append(f'{page} {name}: gap {reference["gap_ms"]:.0f} -> {current["gap_ms"]:.0f} ms')
+    return regressions
+
+
+def main() -> int:
+    """
+    Run the benchmark
+    :return: process exit code, non-zero if regressions against the baseline were found
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3, help='number of measured runs per page and wait')
+    parser.add_argument('--root-path', default=str(PACKAGE_DIR), help='BrowserOptions root path')
+    parser.add_argument('--chrome-path', default='', help='Chrome path override')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='compare results with this file')
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, Any]] = {}
+    browser = Browser(BrowserOptions(args.root_path, headless=True, save_trace_logs=False,
+                                     chrome_path=args.chrome_path, timeout=30))
+    counter = RoundTripCounter(browser)
+    try:
+        with FixtureServer(wait_pages()) as server:
+            for page in PAGES:
+                results[page] = {}
+                for name, wait in WAITS.items():
+                    summary = summarize([measure(browser, counter, server.url(page), wait) for _ in range(args.runs)])
+                    results[page][name] = summary
+                    gap = f'{summary["gap_ms"]:8.0f} ms' if summary['gap_ms'] is not None else '       -   '
+                    print(f'{page:<20} {name:<30} gap={gap}  round trips={summary["round_trips"]:5.0f}  '
+                          f'premature={summary["premature"]}')
+    finally:
+        browser.quit()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as json_file:
+            json.dump(results, json_file, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file))
+        for regression in regressions:
+            print(f'REGRESSION: {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,16 +3,18 @@
 """
 import concurrent.futures
 import os
-import shutil
+import signal
 from datetime import datetime
 from time import sleep, time, monotonic
-from typing import Any, Callable, cast
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, TypeVar, cast
 
 from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, \
     ElementClickInterceptedException
 from selenium.webdriver import Chrome, ActionChains
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
 from selenium.webdriver.remote.webelement import WebElement
 # Intentionally choose to import expected_conditions as upper-case EC
 # noinspection PyPep8Naming
@@ -20,10 +22,30 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
 from .browseroptions import BrowserOptions
+from .cdpevents import LOGGING_PREFS_CAPABILITY, CdpEventLog
+from .daemon import BrowserDaemon, CdpConnection
+from .diskcache import CacheStats
+from .downloads import DownloadManager
 from .log import setup_logging
+from .navreport import COLLECT_SCRIPT, NavigationReport, NetworkCounter
+from .procstats import process_tree
+from .profiletemplate import discard_profile
+from .screenshot import ScreenshotSettings, write_base64
+from .sessionstate import SessionExpiry, SessionState, export_session, import_session
+from .tabscheduler import TabResult, TabScheduler
+from .tracing import traced
+
+if TYPE_CHECKING:
+    from .httpclient import BrowserHttpClient
 
 log = setup_logging(__name__)
 
+T = TypeVar('T')
+
+# Fields of CDP 'Network.CookieParam' accepted by 'Network.setCookies'
+_COOKIE_PARAM_KEYS = ('name', 'value', 'url', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires',
+                      'priority', 'sameParty', 'sourceScheme', 'sourcePort', 'partitionKey')
+
 
 class Browser(Chrome):
     """
@@ -35,10 +57,23 @@ class Browser(Chrome):
 
         :param options: Browser options
         """
+        self._options = options
         self.save_trace_logs = options.save_trace_logs
         self._default_timeout = options.timeout
-        self.user_data_dir = options.user_data_dir
+        # the profile this instance removes when it is deleted or restarted; an attached browser runs in the daemon's
+        # Chrome, whose profile has to outlive it
+        self.user_data_dir = options.user_data_dir if options.daemon is None else None
+        if options.profile_template is not None and options.daemon is None:
+            self.user_data_dir = options.profile_template.clone(options.chrome_location)
         self._error_log_dir = options.error_log_dir
+        self.screenshot_settings = options.screenshot
+        self.trace_snapshot_mode = options.trace_snapshot_mode
+        self.user_agent = options.user_agent
+        self._http: 'BrowserHttpClient | None' = None
+        # last known state, restored by restart() of a hung browser; kept across restarts
+        self.last_url: str = getattr(self, 'last_url', '')
+        self._last_cookies: list[dict[str, Any]] = getattr(self, '_last_cookies', [])
+        self._downloads: DownloadManager | None = None
 
         log.debug(f'Creating new Chrome instance with parameters: "{options}"')
 
@@ -47,22 +82,103 @@ class Browser(Chrome):
         if options.driver_options:
             for opt in options.driver_options:
                 chrome_options.add_argument(opt)
-        if options.chrome_location:
-            log.debug(f'Using Chrome from "{options.chrome_location}"')
-            chrome_options.binary_location = options.chrome_location
+        if self.user_data_dir is not None and options.profile_template is not None:
+            chrome_options.add_argument(f'user-data-dir={self.user_data_dir}')
+        self._cache_slot = None
+        # CDP connection to the browser target, see cdp_connection
+        self._cdp_connection: CdpConnection | None = None
+        # browser context of a browser attached to BrowserOptions.daemon, empty otherwise
+        self.browser_context_id = ''
+        if options.disk_cache is not None and options.daemon is None:
+            self._cache_slot = options.disk_cache.acquire()
+            log.debug(f'Using disk cache "{self._cache_slot}"')
+            chrome_options.add_argument(f'disk-cache-dir={self._cache_slot}')
+            chrome_options.add_argument(f'disk-cache-size={options.disk_cache.max_bytes}')
+        self.cdp_events: CdpEventLog | None = None
+        self._cache_stats: CacheStats | None = None
+        if options.performance_log or options.disk_cache is not None:
+            chrome_options.set_capability(LOGGING_PREFS_CAPABILITY, {'performance': 'ALL'})
+        if options.daemon is not None:
+            self._attach(options.daemon, chrome_options)
+        else:
+            if options.chrome_location:
+                log.debug(f'Using Chrome from "{options.chrome_location}"')
+                chrome_options.binary_location = options.chrome_location
+            try:
+                try:
+                    self._launch(options, chrome_options)
+                except Exception as e:
+                    if not options.headless_shell:
+                        raise
+                    log.warning(f'Cannot launch chrome-headless-shell, falling back to full Chrome: {e}')
+                    options.use_full_chrome()
+                    chrome_options.binary_location = options.chrome_location
+                    self._launch(options, chrome_options)
+            except Exception:
+                if self._cache_slot is not None and options.disk_cache is not None:
+                    options.disk_cache.release(self._cache_slot)
+                raise
+        # for headless mode, set window size at frist page open
+        self.fix_window_size = any('headless' in arg for arg in chrome_options.arguments)
+        self.set_page_load_timeout(options.timeout)
+
+        if options.performance_log or options.disk_cache is not None:
+            self.cdp_events = CdpEventLog(self)
+            self._cache_stats = CacheStats()
+            self.cdp_events.subscribe('Network.', self._cache_stats.handle_event)
+        # keep the report across restart()
+        self.navigation_report: NavigationReport | None = getattr(self, 'navigation_report', None)
+        if options.navigation_report and self.navigation_report is None:
+            self.navigation_report = NavigationReport()
+        self._network_counter: NetworkCounter | None = None
+        if self.navigation_report is not None and self.cdp_events is not None:
+            self._network_counter = NetworkCounter()
+            self.cdp_events.subscribe('Network.', self._network_counter.handle_event)
+
+        self._evade_detection()
+        if options.session_file and os.path.exists(options.session_file):
+            self.restore_session(options.session_file)
+
+    def _launch(self, options: BrowserOptions, chrome_options: Options) -> None:
+        """
+        Launch chromedriver and Chrome
+        :param options: browser options
+        :param chrome_options: session options
+        """
         if options.chromedriver_location:
             log.debug(f'Using Chromedriver from "{options.chromedriver_location}"')
             service = Service(executable_path=options.chromedriver_location)
         else:
             service = None
-
         # supress mypy warning as service in WebDriver is actually defined as "service: Service = None"
         super().__init__(service=service, options=chrome_options)  # type: ignore[arg-type]
-        # for headless mode, set window size at frist page open
-        self.fix_window_size = any('headless' in arg for arg in chrome_options.arguments)
-        self.set_page_load_timeout(options.timeout)
 
-        self._evade_detection()
+    @traced('browser.attach')
+    def _attach(self, daemon: BrowserDaemon, chrome_options: Options) -> None:
+        """
+        Start a WebDriver session on the daemon's chromedriver and Chrome, and switch it to a new tab in a browser
+        context of its own. The context is disposed when the browser quits or its process exits, as it is bound to
+        the CDP connection creating it.
+
+        :param daemon: browser daemon, launched or relaunched if it is not healthy
+        :param chrome_options: session options
+        """
+        state = daemon.ensure()
+        chrome_options.debugger_address = state.debugger_address
+        executor = ChromiumRemoteConnection(remote_server_addr=state.chromedriver_url, vendor_prefix='goog',
+                                            browser_name='chrome', ignore_proxy=True)
+        # Chrome.__init__ would launch chromedriver, so the session is started by the remote WebDriver directly
+        RemoteWebDriver.__init__(self, command_executor=executor, options=chrome_options)
+        self.service = None  # type: ignore[assignment]
+        try:
+            self._cdp_connection = CdpConnection(state.debugger_address)
+            self.browser_context_id = self._cdp_connection.execute(
+                'Target.createBrowserContext', {'disposeOnDetach': True})['browserContextId']
+            self.new_tab()
+        except Exception:
+            self.quit()
+            raise
+        log.debug(f'Attached to browser daemon {state.debugger_address}, browser context {self.browser_context_id}')
 
     def _evade_detection(self) -> None:
         self.execute_cdp_cmd(
@@ -107,12 +223,222 @@ class Browser(Chrome):
             }
         )
 
+    def get_all_cookies(self) -> list[dict[str, Any]]:
+        """
+        Get cookies of all domains, unlike WebDriver get_cookies() which returns cookies of the current page only
+        :return: list of CDP 'Network.Cookie' objects
+        """
+        self._last_cookies = cast(list[dict[str, Any]], self.execute_cdp_cmd('Network.getAllCookies', {})['cookies'])
+        return self._last_cookies
+
+    def set_all_cookies(self, cookies: list[dict[str, Any]]) -> None:
+        """
+        Set cookies of any domains, e.g. ones returned by get_all_cookies()
+        :param cookies: list of CDP 'Network.Cookie' objects
+        """
+        params = []
+        for cookie in cookies:
+            param = {key: value for key, value in cookie.items() if key in _COOKIE_PARAM_KEYS}
+            if cookie.get('session') or param.get('expires', -1) < 0:
+                param.pop('expires', None)
+            params.append(param)
+        if params:
+            self.execute_cdp_cmd('Network.setCookies', {'cookies': params})
+
+    @traced('browser.save_session', 'path')
+    def save_session(self, path: str, origins: Iterable[str] = (), passphrase: str | None = None) -> None:
+        """
+        Save cookies and web storage into an encrypted file, so that a later run can skip logging in
+
+        :param path: output file
+        :param origins: origins (or URLs) whose web storage is saved, in addition to the current page's origin
+        :param passphrase: encryption passphrase (default: value of BROWSER_SESSION_KEY environment variable)
+        """
+        export_session(self, origins).save(path, passphrase)
+
+    @traced('browser.restore_session', 'path')
+    def restore_session(self, path: str, passphrase: str | None = None) -> SessionExpiry:
+        """
+        Restore cookies and web storage saved with save_session(); call it before opening the first page
+
+        :param path: session file
+        :param passphrase: encryption passphrase (default: value of BROWSER_SESSION_KEY environment variable)
+        :return: cookie expiry summary
+        """
+        return import_session(self, SessionState.load(path, passphrase))
+
+    def remember_state(self) -> None:
+        """
+        Record the current URL and cookies, restored by restart(hung=True) which cannot read them from a hung browser
+        """
+        self.last_url = self.current_url
+        self.get_all_cookies()
+
+    @traced('browser.restart', 'hung')
+    def restart(self, hung: bool = False) -> None:
+        """
+        Replace the Chrome process with a new one, keeping the current URL and cookies
+
+        :param hung: the browser does not answer; its processes are killed right away, as any command (including
+            quit()) would wait for the hung one, and the URL and cookies last recorded are restored
+        """
+        pids = process_tree(self.service.process.pid) if self.service and self.service.process else []
+        if hung:
+            url, cookies = self.last_url, self._last_cookies
+            log.warning('Browser is hung, killing its processes')
+            self._kill(pids)
+        else:
+            url, cookies = '', []
+            # the browser may be unresponsive, so restart it even if its state cannot be saved
+            # noinspection PyBroadException
+            try:
+                url = self.current_url
+                cookies = self.get_all_cookies()
+            except Exception as e:
+                log.warning(f'Cannot save browser state before restart: {e}')
+        try:
+            self.quit()
+        except Exception as e:
+            log.warning(f'Error closing browser before restart: {e}, killing its processes')
+            self._kill(pids)
+        if self._options.profile_template is not None:
+            # the new instance gets a fresh clone
+            discard_profile(self.user_data_dir)
+        log.debug(f'Restarting browser at "{url}" with {len(cookies)} cookies')
+        Browser.__init__(self, self._options)
+        self.set_all_cookies(cookies)
+        if url.startswith('http'):
+            self.get(url)
+
+    @staticmethod
+    def _kill(pids: list[int]) -> None:
+        """
+        Kill processes ignoring the ones that already exited
+        :param pids: process ids
+        """
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    @property
+    def http(self) -> 'BrowserHttpClient':
+        """
+        Plain HTTP client sharing this browser's cookies and user agent, for requests that need no rendering
+        """
+        if self._http is None:
+            # imported on first use, as it pulls in 'requests'
+            from .httpclient import BrowserHttpClient
+            self._http = BrowserHttpClient(self)
+        return self._http
+
+    @property
+    def downloads(self) -> DownloadManager:
+        """
+        Download manager of this browser; requires BrowserOptions.performance_log
+        """
+        if self._downloads is None:
+            self._downloads = DownloadManager(self, self._options.download_dir)
+        return self._downloads
+
+    def cache_stats(self) -> CacheStats:
+        """
+        HTTP cache usage since the browser has started; requires BrowserOptions.disk_cache or performance_log
+
+        :return: cache statistics
+        """
+        if self.cdp_events is None or self._cache_stats is None:
+            raise RuntimeError('Cache statistics require BrowserOptions.performance_log or disk_cache')
+        self.cdp_events.poll()
+        return self._cache_stats
+
+    def quit(self) -> None:
+        """
+        Close the browser and its HTTP client, and release its disk cache slot
+        """
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+        try:
+            if self._options.daemon is not None:
+                self._close_context()
+                # the session only detaches from the daemon's Chrome, there is no chromedriver service to stop
+                RemoteWebDriver.quit(self)
+            else:
+                if self._cdp_connection is not None:
+                    self._cdp_connection.close()
+                    self._cdp_connection = None
+                super().quit()
+        finally:
+            if self._cache_slot is not None and self._options.disk_cache is not None:
+                self._options.disk_cache.release(self._cache_slot)
+                self._cache_slot = None
+
+    @property
+    def cdp_connection(self) -> CdpConnection:
+        """
+        CDP connection to the browser target, bypassing chromedriver; commands sent through it to page targets
+        (with a session id) neither wait for nor block the WebDriver session's commands
+        """
+        if self._cdp_connection is None:
+            self._cdp_connection = CdpConnection(self.capabilities['goog:chromeOptions']['debuggerAddress'])
+        return self._cdp_connection
+
+    @property
+    def window_handles(self) -> list[str]:
+        """
+        Handles of all windows; a browser attached to a daemon only sees the windows of its own browser context
+        """
+        handles = super().window_handles
+        if not self.browser_context_id:
+            return handles
+        own = {info['targetId'] for info in self.cdp_connection.execute('Target.getTargets')['targetInfos']
+               if info.get('browserContextId') == self.browser_context_id}
+        return [handle for handle in handles if handle in own]
+
+    def new_tab(self) -> str:
+        """
+        Open an empty tab, in the browser's own context if it is attached to a daemon, and switch to it
+
+        :return: window handle of the new tab
+        """
+        if not self.browser_context_id:
+            self.switch_to.new_window('tab')
+            return self.current_window_handle
+        # chromedriver window handles are CDP target ids
+        handle: str = self.cdp_connection.execute(
+            'Target.createTarget', {'url': 'about:blank', 'browserContextId': self.browser_context_id})['targetId']
+        self.switch_to.window(handle)
+        return handle
+
+    def _close_context(self) -> None:
+        """
+            Dispose the browser context of an attached browser, closing its tabs.
+        """
+        connection, self._cdp_connection = self._cdp_connection, None
+        if connection is None:
+            return
+        try:
+            if self.browser_context_id:
+                connection.execute('Target.disposeBrowserContext', {'browserContextId': self.browser_context_id})
+        except Exception as e:
+            log.warning(f'Cannot dispose browser context {self.browser_context_id}: {e}')
+        finally:
+            connection.close()
+
     def __del__(self) -> None:
         """
-            Delete user profile if exists
+            Delete user profile if exists, without waiting for the deletion to complete
         """
-        if self.user_data_dir and self.user_data_dir.exists():
-            shutil.rmtree(self.user_data_dir)
+        discard_profile(self.user_data_dir)
+
+    @property
+    def default_timeout(self) -> int:
+        """
+        Default timeout value for relevant operations
+        """
+        return self._default_timeout
 
     @property
     def error_log_dir(self) -> str:
@@ -125,6 +451,45 @@ class Browser(Chrome):
     def error_log_dir(self, value: str) -> None:
         self._error_log_dir = value
 
+    @traced('browser.capture_screenshot', 'filename')
+    def capture_screenshot(self, filename: str, settings: ScreenshotSettings | None = None,
+                           element: WebElement | None = None, clip: dict[str, float] | None = None) -> str:
+        """
+        Save a screenshot using CDP 'Page.captureScreenshot', which supports lossy formats, clipping and scaling
+        unlike WebDriver screenshots
+
+        :param filename: output file name without extension, the extension is appended according to the format
+        :param settings: screenshot settings or None if the browser default settings should be used
+        :param element: capture the area of this element only
+        :param clip: capture this area only, given as a dict with 'x', 'y', 'width' and 'height' keys in CSS pixels
+        :return: output file name
+        """
+        settings = settings or self.screenshot_settings
+        parameters = settings.cdp_parameters()
+        if element is not None:
+            clip = self._execute_javascript('''
+                const rect = arguments[0].getBoundingClientRect();
+                return {x: rect.left + window.scrollX, y: rect.top + window.scrollY,
+                        width: rect.width, height: rect.height};
+            ''', element)
+        elif settings.full_page or (clip is None and settings.scale != 1.0):
+            # the clip rectangle is the only way to request scaling, so it is required for downscaling as well
+            metrics = self.execute_cdp_cmd('Page.getLayoutMetrics', {})
+            if settings.full_page:
+                size = metrics['cssContentSize']
+                clip = {'x': 0, 'y': 0, 'width': size['width'], 'height': size['height']}
+            else:
+                viewport = metrics['cssVisualViewport']
+                clip = {'x': viewport['pageX'], 'y': viewport['pageY'],
+                        'width': viewport['clientWidth'], 'height': viewport['clientHeight']}
+        if clip is not None:
+            parameters['clip'] = {**clip, 'scale': settings.scale}
+        if settings.full_page or element is not None:
+            parameters['captureBeyondViewport'] = True
+        output = f'{filename}.{settings.extension}'
+        write_base64(self.execute_cdp_cmd('Page.captureScreenshot', parameters)['data'], output)
+        return output
+
     @staticmethod
     def dump_element(element: WebElement | None) -> None:
         """
@@ -195,6 +560,7 @@ class Browser(Chrome):
 
         return _check
 
+    @traced('browser.click_element_with_js', 'by', 'value', 'timeout')
     def click_element_with_js(self, element: WebElement, by: str = '', value: str = '',
                               timeout: int | None = None) -> None:
         """
@@ -220,6 +586,7 @@ class Browser(Chrome):
             else:
                 raise
 
+    @traced('browser.click_with_retry', 'by', 'value', 'timeout')
     def click_with_retry(self, element: WebElement, by: str, value: str, timeout: int | None = None) -> None:
         """
         Try to click an element until it's neither overlapped nor refreshed by DOM change, or timeout expires.
@@ -252,12 +619,29 @@ class Browser(Chrome):
         """
         self.click_element_with_js(self.find_element(by, value))
 
+    @traced('browser.get', 'url')
     def get(self, url: str) -> None:
         """
         Opens provider URL. In headless mode, at first call also sets screen size to match window size
         :param url: URL to open
         """
-        super().get(url)
+        if self.navigation_report is not None and self._network_counter is not None:
+            self.cdp_events.poll()  # type: ignore[union-attr]
+            self._network_counter.reset()
+        start = monotonic()
+        self.last_url = url
+        error: Exception | None = None
+        try:
+            super().get(url)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.navigation_report is not None:
+                self._record_navigation(url, (monotonic() - start) * 1000, error)
+        if self.cdp_events is not None and self.navigation_report is None:
+            # keep the chromedriver event buffer short
+            self.cdp_events.poll()
         if self.fix_window_size:
             window_size = self.get_window_size()
             self.execute_cdp_cmd("Emulation.setDeviceMetricsOverride", {
@@ -274,6 +658,27 @@ class Browser(Chrome):
             })
             self.fix_window_size = False
 
+    def _record_navigation(self, url: str, duration_ms: float, error: Exception | None = None) -> None:
+        """
+        Add performance metrics of the page just loaded to the navigation report
+        :param url: URL requested
+        :param duration_ms: navigation wall time
+        :param error: exception raised by the navigation; page metrics are not collected for a failed one
+        """
+        # a failure to collect metrics must never fail (or hide the error of) the navigation itself
+        # noinspection PyBroadException
+        try:
+            if self.cdp_events is not None:
+                # keep the chromedriver event buffer short, and count the navigation's network events
+                self.cdp_events.poll()
+            metrics = self._execute_javascript(COLLECT_SCRIPT) if error is None else {}
+        except Exception as e:
+            log.debug(f'Cannot collect navigation metrics of "{url}": {e}')
+            metrics = {}
+        self.navigation_report.add(url, duration_ms, metrics or {}, self._network_counter,  # type: ignore[union-attr]
+                                   error)
+
+    @traced('browser.open_in_new_tab', 'url')
     def open_in_new_tab(self, url: str, close_old_tab: bool = True) -> None:
         """
         Opens URL in a new browser card
@@ -284,24 +689,35 @@ class Browser(Chrome):
         try:
             old_tab = self.current_window_handle
 
-            # Open a new empty card
-            self._execute_javascript('window.open('');')
-
-            # Switch to the new card (it's last on the card list)
-            self.switch_to.window(self.window_handles[-1])
+            # Open a new empty card and switch to it
+            new_tab = self.new_tab()
             self.get(url)
 
             # Close the old card, if requested
-            if close_old_tab and old_tab != self.current_window_handle:
+            if close_old_tab and old_tab != new_tab:
                 self.switch_to.window(old_tab)
                 self.close()
 
                 # Switch to the card opened above
-                self.switch_to.window(self.window_handles[-1])
+                self.switch_to.window(new_tab)
 
         except Exception as e:
             print(f'Error navigating to "{url}": {e}')
 
+    def open_in_tabs(self, urls: Iterable[str], worker: Callable[['Browser', str], T],
+                     max_tabs: int = 4, timeout: int | None = None) -> Iterator['TabResult[T]']:
+        """
+        Load URLs in up to :param max_tabs tabs at once and call :param worker for each loaded page.
+        See TabScheduler for details.
+
+        :param urls: URLs to process
+        :param worker: callable receiving the browser (switched to the page's tab) and the URL
+        :param max_tabs: maximum number of tabs used
+        :param timeout: page load timeout or None if the default timeout should be used
+        :return: iterator over results in completion order
+        """
+        return TabScheduler(self, max_tabs, timeout).run(urls, worker)
+
     def open_dropdown_menu(self, by: str, value: str) -> None:
         """
         Opens the provided dropdown menu
@@ -314,6 +730,7 @@ class Browser(Chrome):
         else:
             raise TimeoutException(f'Timeout expired waiting for element ("{by}", "{value}") to appear!')
 
+    @traced('browser.safe_click', 'by', 'value', 'timeout')
     def safe_click(self, by: str, value: str, timeout: int | None = None, ignore_exception: bool = False) -> None:
         """
         Wait until the provided WebElement becomes clickable, then click it and save its screenshot if the click fails
@@ -327,6 +744,7 @@ class Browser(Chrome):
         self.trace_click(
             self.wait_for_element_clickable(by, value, timeout), ignore_exception)
 
+    @traced('browser.trace_click')
     def trace_click(self, element: WebElement, ignore_exception: bool = False) -> None:
         """
         Click the provided WebElement and save its screenshot if the click fails
@@ -341,9 +759,9 @@ class Browser(Chrome):
             element.click()
         except Exception:
             timestamp = datetime.today().isoformat(sep=' ', timespec='milliseconds').replace(':', '-')
-            file_name = f'{timestamp} {element.tag_name} error.png'
+            file_name = f'{timestamp} {element.tag_name} error'
             os.makedirs(self.error_log_dir, exist_ok=True)
-            element.screenshot(os.path.join(self.error_log_dir, file_name))
+            self.capture_screenshot(os.path.join(self.error_log_dir, file_name), element=element)
             print('Error clicking element:')
             print(f'Tag: {element.tag_name}')
             print(f'HTML: {element.get_attribute("outerHTML")}')
@@ -351,6 +769,7 @@ class Browser(Chrome):
             if not ignore_exception:
                 raise
 
+    @traced('browser.wait_for_condition', 'timeout')
     def wait_for_condition(self, condition: Callable[..., bool], timeout: int | None = None) -> None:
         """
         Wait until the condition specified is True or timeout expires
@@ -373,6 +792,7 @@ class Browser(Chrome):
         items = self.wait_for_elements(by, value, timeout)
         return items[0] if items else None
 
+    @traced('browser.wait_for_elements', 'by', 'value', 'timeout', falsy_outcome='timeout')
     def wait_for_elements(self, by: str, value: str, timeout: int | None = None) -> list[WebElement] | None:
         """
         Wait until all matching elements become visible, or the timeout expires
@@ -392,6 +812,7 @@ class Browser(Chrome):
             pass
         return items
 
+    @traced('browser.wait_for_element_appear', 'by', 'value', 'timeout')
     def wait_for_element_appear(self, by: str, value: str, timeout: int | None = None) -> WebElement:
         """
         Wait until a web element appears or timeout expires
@@ -404,6 +825,7 @@ class Browser(Chrome):
             EC.presence_of_element_located((by, value))
         )
 
+    @traced('browser.wait_for_element_clickable', 'by', 'value', 'timeout')
     def wait_for_element_clickable(self, by: str, value: str, timeout: int | None = None) -> WebElement:
         """
         Wait until a web element becomes clickable or the timeout expires
@@ -433,6 +855,7 @@ class Browser(Chrome):
 
         return clickable
 
+    @traced('browser.wait_for_element_disappear', 'by', 'value', 'timeout')
     def wait_for_element_disappear(self, by: str, value: str, timeout: int | None = None) -> None:
         """
         Wait until a web element disappears or timeout expires
@@ -446,6 +869,7 @@ class Browser(Chrome):
         )
         return None
 
+    @traced('browser.wait_for_network_inactive', 'timeout')
     def wait_for_network_inactive(self, timeout: int | None = None) -> None:
         """
         Wait untli page is full loaded by checking if any network activity is stopped
@@ -481,6 +905,7 @@ class Browser(Chrome):
         # Finally, wait a short time for any final rendering or initialization
         sleep(0.5)
 
+    @traced('browser.wait_for_page_inactive', 'timeout', falsy_outcome='timeout')
     def wait_for_page_inactive(self, timeout: int | None = None) -> Any:
         """
         Wait untli page is full loaded, more heavy version (DOM stopped changing)
@@ -522,6 +947,7 @@ class Browser(Chrome):
                 log.debug(f'Timeout {timeout}(s) expired waiting for page to become inactive!')
                 return False
 
+    @traced('browser.wait_for_page_load_completed')
     def wait_for_page_load_completed(self) -> None:
         """
         Wait untli page is full loaded, the lightest version (document ready state is 'complete')
@@ -532,6 +958,7 @@ class Browser(Chrome):
             log.debug(f'Page load state == {state}')
             sleep(0.1)
 
+    @traced('browser.wait_for_page_stable', 'stable_time', 'timeout', falsy_outcome='timeout')
     def wait_for_page_stable(self, stable_time: int, timeout: int | None = None) -> bool:
         """Wait until no DOM changes occur for 'stable_time' seconds
         :param stable_time: requested page stability time in seconds
@@ -565,6 +992,7 @@ class Browser(Chrome):
 
         return False  # Timeout reached
 
+    @traced('browser.execute_script', 'script')
     def _execute_javascript(self, script: str, *args: Any) -> Any:
         """
         Wrapper for WebDriver.execute_script to satisfy 'mypy --scrict'
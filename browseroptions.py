@@ -2,21 +2,37 @@
     Browser options
 """
 import re
+import shutil
 import subprocess
 import tempfile
 from pathlib import Path
+from typing import Iterable
 
-from .chromedownloader import ChromeDownloader
+from .daemon import BrowserDaemon
+from .diskcache import DiskCache
+from .domsnapshot import SnapshotMode
+from .flagprofiles import FlagProfile, resolve_flags
 from .platforminfo import PlatformInfo
+from .profiletemplate import ProfileTemplate, sweep_trash
+from .screenshot import ScreenshotSettings
 
-
+# Chrome for Testing build of the old headless mode, smaller and faster to start than full Chrome
+HEADLESS_SHELL = 'chrome-headless-shell'
+# Version of the chrome-headless-shell build, written next to it, as the archive does not record one
+_VERSION_FILE = '.version'
+# Timeout of chrome-headless-shell download requests, in seconds
+_DOWNLOAD_TIMEOUT = 30
+# Set once the temp directory has been swept of discarded profiles; one sweep per process is enough
+_trash_swept = False
 
 class BrowserOptions:
     """
     Browser options class
     """
 
-    def __init__(self, root_path: str, headless: bool, save_trace_logs: bool, chrome_path: str, timeout: int = 10) -> None:
+    def __init__(self, root_path: str, headless: bool, save_trace_logs: bool, chrome_path: str, timeout: int = 10,
+                 profile_template: ProfileTemplate | None = None,
+                 flag_profiles: Iterable[str] = (FlagProfile.STEALTH,), headless_shell: bool = True) -> None:
         """
         Class construstor
         :param root_path: Chromediver root path
@@ -24,24 +40,60 @@ class BrowserOptions:
         :param save_trace_logs: if 'True', trace logs on page elements operations are saved
         :param chrome_path: Chrome path override
         :param timeout: default timeout value for relevant operations
+        :param profile_template: if set, each instance gets its own clone of the template as a user data dir
+        :param flag_profiles: names of Chrome switch sets to apply, see FlagProfile (default: stealth)
+        :param headless_shell: in headless mode, run chrome-headless-shell instead of full Chrome if it can be
+            downloaded; ignored if chrome_path is set
         """
         self.chromedriver_location = ''
         self.chrome_location = ''
         self.user_data_dir = None
-        self.driver_options = ['disable-blink-features=AutomationControlled','window-size=1920,1200', 'log-level=3', 'disable-dev-shm-usage']
+        self.driver_options = ['disable-blink-features=AutomationControlled','window-size=1920,1200', 'log-level=3', 'disable-dev-shm-usage',
+                               'no-sandbox']
         self.save_trace_logs = save_trace_logs
         if headless:
             self.driver_options.append('headless')
         self.timeout = timeout
-        self._configure_chromedriver_location(root_path, chrome_path)
-        self.driver_options.append('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
-                                   f'(KHTML, like Gecko) Chrome/138.0.7204.49 Safari/537.36') # for multimedia service login error in headless mode
-        # Options that potentially lowers reCaptcha v3 (automatic bot detection) score, making some page unusable
-        self.driver_options += ['disable-gpu', 'disable-webgl', 'enable-unsafe-swiftshader', 'no-sandbox']
+        # set if chrome_location points to chrome-headless-shell; full Chrome is used if the shell fails to launch
+        self.headless_shell = False
+        self.full_chrome_location = ''
+        self._configure_chromedriver_location(root_path, chrome_path, headless and headless_shell)
+        self.user_agent = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                           '(KHTML, like Gecko) Chrome/138.0.7204.49 Safari/537.36')
+        self.driver_options.append(f'user-agent={self.user_agent}') # for multimedia service login error in headless mode
+        self.flag_profiles = list(flag_profiles)
+        self.driver_options += resolve_flags(self.flag_profiles)
         # Another remedy for reCatcha v3
-        self.user_data_dir = Path(tempfile.gettempdir(), "myprofile")
-        self.driver_options += [f'user-data-dir={self.user_data_dir}']
+        # with a template, every Browser clones its own user data dir when it starts
+        self.profile_template = profile_template
+        if profile_template is None:
+            self.user_data_dir = Path(tempfile.gettempdir(), "myprofile")
+            self.driver_options += [f'user-data-dir={self.user_data_dir}']
+            # leftovers of profiles discarded by processes that exited before deleting them
+            global _trash_swept
+            if not _trash_swept:
+                _trash_swept = True
+                sweep_trash(self.user_data_dir.parent)
         self.error_log_dir = 'error'
+        # Settings of trace and error screenshots
+        self.screenshot = ScreenshotSettings()
+        # Page source snapshot mode of trace logs; SnapshotMode.DIFF saves only changes against the previous trace
+        self.trace_snapshot_mode = SnapshotMode.FULL
+        # Session file saved with Browser.save_session(), restored when the browser starts
+        self.session_file: str | None = None
+        # Persistent HTTP cache used instead of the one in the throwaway profile; implies performance_log
+        self.disk_cache: DiskCache | None = None
+        # Record CDP 'Network.*' and 'Page.*' events, read through Browser.cdp_events
+        self.performance_log = False
+        # Download directory of Browser.downloads, a new temporary directory per browser if not set
+        self.download_dir: str | None = None
+        # Collect performance metrics of every get() into Browser.navigation_report; network bytes and requests
+        # counted from CDP events are added if performance_log is enabled as well
+        self.navigation_report = False
+        # Attach to the long-lived Chrome and chromedriver of this daemon, in a browser context of its own, instead of
+        # launching them; Chrome switches apply to the daemon launch only, and disk_cache is not used, as browser
+        # contexts keep their HTTP cache in memory
+        self.daemon: BrowserDaemon | None = None
 
     def __repr__(self) -> str:
         """
@@ -49,17 +101,21 @@ class BrowserOptions:
         """
         return ', '.join([f'{name}={value}' for name, value in self.__dict__.items()])
 
-    def _configure_chromedriver_location(self, root_path: str, chrome_path: str) -> None:
+    def _configure_chromedriver_location(self, root_path: str, chrome_path: str, headless_shell: bool) -> None:
         """
         Configure a Chrome/Chromedriver path per operating system. Expectedy folder layout:
         root_path/
             └── chromedriver/
                 ├── chromedriver[.exe]
-                └── chrome/
-                    ├── <chrome files>
-                    └── chrome[.exe]
+                ├── chrome/
+                │   ├── <chrome files>
+                │   └── chrome[.exe]
+                └── chrome-headless-shell/
+                    ├── <chrome-headless-shell files>
+                    └── chrome-headless-shell[.exe]
         :param root_path: Chrome/Chromedriver root path
         :param chrome_path: Chrome path override
+        :param headless_shell: prefer chrome-headless-shell, downloaded on first use, to full Chrome
         """
         platform_info = PlatformInfo()
         if platform_info.system_is('Darwin'):  # running on macOS
@@ -68,18 +124,102 @@ class BrowserOptions:
             chromedriver_root = Path(root_path).parent.joinpath('chromedriver')
             if not chromedriver_root.exists():
                 print(f'Chromedriver not found in "{chromedriver_root}", downloading...')
+                # Imported here as it pulls in 'requests', which is only needed when actually downloading
+                from .chromedownloader import ChromeDownloader
                 chrome_downloader = ChromeDownloader(platform_info.platform)
                 chrome_downloader.download_all(chromedriver_root, 'chrome')
             chromedriver_root = chromedriver_root.resolve(True)
             self.chromedriver_location = str(chromedriver_root.joinpath('chromedriver'))
-            if not chrome_path:
-                self.chrome_location = str(chromedriver_root.joinpath('chrome').joinpath('chrome'))
-            else:
+            executable_suffix = '.exe' if platform_info.system_is('Windows') else ''
+            self.chromedriver_location += executable_suffix
+            # Append '.exe' extension to Chrome path only if if was autodetected
+            self.full_chrome_location = str(chromedriver_root.joinpath('chrome').joinpath('chrome')) + executable_suffix
+            if chrome_path:
                 self.chrome_location = chrome_path
-            if platform_info.system_is('Windows'):
-                self.chromedriver_location += '.exe'
-                if not chrome_path:
-                    # Append '.exe' extension to Chrome path only if if was autodetected
-                    self.chrome_location += '.exe'
+            elif headless_shell and self._download_headless_shell(chromedriver_root, platform_info.platform,
+                                                                  _chromedriver_version(self.chromedriver_location)):
+                self.headless_shell = True
+                self.chrome_location = \
+                    str(chromedriver_root.joinpath(HEADLESS_SHELL).joinpath(HEADLESS_SHELL)) + executable_suffix
+            else:
+                self.chrome_location = self.full_chrome_location
         else:
             raise NotImplementedError(f'"{platform_info.system}" is not supported.')
+
+    def use_full_chrome(self) -> None:
+        """
+            Switch from chrome-headless-shell to full Chrome, e.g. after the shell failed to launch.
+        """
+        if self.headless_shell:
+            self.chrome_location = self.full_chrome_location
+            self.headless_shell = False
+
+    @staticmethod
+    def _download_headless_shell(chromedriver_root: Path, platform: str, version: str) -> bool:
+        """
+        Make sure chrome-headless-shell of the chromedriver version is present next to Chrome, downloading it if
+        needed. A build found missing (no such version or platform) is remembered per chromedriver version, so it is
+        not looked up by every instance; other failures (network errors, timeouts) are retried by the next instance.
+        :param chromedriver_root: Chromedriver root directory
+        :param platform: Chrome for Testing platform name
+        :param version: installed chromedriver version; the shell is not used if it is unknown
+        :return: True if chrome-headless-shell is available, False if full Chrome has to be used
+        """
+        if not version:
+            return False
+        shell_dir = chromedriver_root.joinpath(HEADLESS_SHELL)
+        version_file = shell_dir.joinpath(_VERSION_FILE)
+        failure_file = chromedriver_root.joinpath(f'.{HEADLESS_SHELL}-unavailable')
+        if version_file.exists() and version_file.read_text(encoding='utf-8').strip() == version:
+            return True
+        if failure_file.exists() and failure_file.read_text(encoding='utf-8').strip() == version:
+            return False
+        print(f'chrome-headless-shell {version} not found in "{shell_dir}", downloading...')
+        from .chromedownloader import ChromeDownloader
+        # the archive is unpacked into a staging directory first, so a failed download does not leave a partial one
+        staging = chromedriver_root.joinpath(f'.build-{HEADLESS_SHELL}')
+        # noinspection PyBroadException
+        try:
+            shutil.rmtree(staging, ignore_errors=True)
+            downloader = ChromeDownloader(platform, version=version, timeout=_DOWNLOAD_TIMEOUT)
+            downloader.download(ChromeDownloader.Component.CHROME_HEADLESS_SHELL, staging)
+            staging.joinpath(_VERSION_FILE).write_text(version, encoding='utf-8')
+            # a shell of another chromedriver version is replaced
+            shutil.rmtree(shell_dir, ignore_errors=True)
+            staging.rename(shell_dir)
+        except Exception as e:
+            print(f'Cannot download chrome-headless-shell {version}, using full Chrome: {e}')
+            shutil.rmtree(staging, ignore_errors=True)
+            if _build_unavailable(e):
+                failure_file.write_text(version, encoding='utf-8')
+            return False
+        failure_file.unlink(missing_ok=True)
+        return True
+
+
+def _build_unavailable(error: Exception) -> bool:
+    """
+    :param error: exception raised by a Chrome for Testing download
+    :return: True if the failure is definitive: the version is not published (HTTP 404) or has no build of the
+        component for the platform
+    """
+    import requests
+
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code == 404
+    # missing component in the version manifest, or no entry for the platform
+    return isinstance(error, (KeyError, StopIteration))
+
+
+def _chromedriver_version(chromedriver_location: str) -> str:
+    """
+    :param chromedriver_location: chromedriver executable
+    :return: chromedriver version, e.g. '138.0.7204.49', or an empty string if it cannot be read
+    """
+    try:
+        output = subprocess.run([chromedriver_location, '--version'], capture_output=True, text=True,
+                                timeout=_DOWNLOAD_TIMEOUT).stdout
+    except (OSError, subprocess.SubprocessError):
+        return ''
+    match = re.search(r'ChromeDriver (\d+\.\d+\.\d+\.\d+)', output)
+    return match.group(1) if match else ''
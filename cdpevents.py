@@ -0,0 +1,67 @@
+"""
+    CDP events delivered through the chromedriver performance log
+"""
+import json
+from typing import TYPE_CHECKING, Any, Callable
+
+from .log import setup_logging
+
+if TYPE_CHECKING:
+    from .browser import Browser
+
+log = setup_logging(__name__)
+
+# Chrome capability enabling the performance log, which carries 'Network.*' and 'Page.*' CDP events
+LOGGING_PREFS_CAPABILITY = 'goog:loggingPrefs'
+
+CdpEventHandler = Callable[[str, dict[str, Any]], None]
+
+
+class CdpEventLog:
+    """
+    Reads CDP events recorded by chromedriver and dispatches them to subscribers. Reading drains the log, so all
+    consumers of the events within one browser have to subscribe here rather than read the log on their own.
+    """
+
+    def __init__(self, browser: 'Browser') -> None:
+        """
+        Class constructor
+        :param browser: browser started with the performance log enabled
+        """
+        self.browser = browser
+        self._subscribers: list[tuple[str, CdpEventHandler]] = []
+
+    def subscribe(self, prefix: str, handler: CdpEventHandler) -> None:
+        """
+        Register an event handler
+        :param prefix: event method prefix, e.g. 'Network.' or 'Page.downloadProgress'
+        :param handler: callable receiving the event method and its parameters
+        """
+        self._subscribers.append((prefix, handler))
+
+    def unsubscribe(self, handler: CdpEventHandler) -> None:
+        """
+        Remove an event handler
+        :param handler: handler registered with subscribe()
+        """
+        self._subscribers = [item for item in self._subscribers if item[1] is not handler]
+
+    def poll(self) -> int:
+        """
+        Read events recorded since the previous call and pass them to subscribers
+        :return: number of events read
+        """
+        # Ignore 'mypy --strict' error on a library function
+        entries = self.browser.get_log('performance')  # type: ignore[no-untyped-call]
+        for entry in entries:
+            message = json.loads(entry['message'])['message']
+            method, params = message.get('method', ''), message.get('params', {})
+            for prefix, handler in self._subscribers:
+                if method.startswith(prefix):
+                    # a failing subscriber must not prevent the others from receiving the event
+                    # noinspection PyBroadException
+                    try:
+                        handler(method, params)
+                    except Exception as e:
+                        log.warning(f'CDP event handler failed for {method}: {e}')
+        return len(entries)
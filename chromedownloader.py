@@ -11,11 +11,14 @@ from typing import Any
 
 import requests
 from .log import setup_logging
+from .tracing import span, traced
 from functools import cached_property
 log = setup_logging(__name__)
 
 CHROME_API_ENDPOINT_URL = \
     'https://googlechromelabs.github.io/chrome-for-testing/last-known-good-versions-with-downloads.json'
+# Downloads of a single version, e.g. one matching an installed chromedriver
+CHROME_VERSION_ENDPOINT_URL = 'https://googlechromelabs.github.io/chrome-for-testing/{version}.json'
 
 
 def unpack(content: bytes, archive_dir: str, output_dir: str | Path) -> None:
@@ -52,29 +55,42 @@ class ChromeDownloader:
         """
         CHROME = 'chrome'
         CHROMEDRIVER = 'chromedriver'
+        # old headless mode only build, smaller and faster to start; its binary is 'chrome-headless-shell[.exe]'
+        CHROME_HEADLESS_SHELL = 'chrome-headless-shell'
 
-    def __init__(self, platform_name: str) -> None:
+    def __init__(self, platform_name: str, version: str | None = None, timeout: float | None = None) -> None:
         """
-            Initialize the downloader with platform-specific settings.
+        Initialize the downloader with platform-specific settings.
+        :param platform_name: Chrome for Testing platform name
+        :param version: exact version to download, or None for the latest stable one
+        :param timeout: connect/read timeout of every request, or None to wait indefinitely
         """
         self.platform_name = platform_name
+        self.version = version
+        self.timeout = timeout
 
     @cached_property
+    @traced('chromedownloader.manifest')
     def downloads(self) -> Any:
         """
-        Latest available stable downloads
+        Latest available stable downloads, or downloads of the version requested
 
         :return: Dictionary which contains downloads info
         """
         try:
-            response = requests.get(CHROME_API_ENDPOINT_URL)
+            if self.version:
+                response = requests.get(CHROME_VERSION_ENDPOINT_URL.format(version=self.version), timeout=self.timeout)
+                response.raise_for_status()
+                return response.json()['downloads']
+            response = requests.get(CHROME_API_ENDPOINT_URL, timeout=self.timeout)
             response.raise_for_status()
             data = response.json()
             return data['channels']['Stable']['downloads']
-        except requests.exceptions.ConnectionError as e:
-            log.error(f'Failed to download latest stable downloads: {e}')
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            log.error(f'Failed to download Chrome for Testing downloads: {e}')
             return None
 
+    @traced('chromedownloader.download_all', 'chromedriver_root')
     def download_all(self, chromedriver_root: Path, chrome_subdir: str | Path) -> None:
         """
         Downloads all components (Chrome driver and Chrome) into directories provided. The target directory tree will be:
@@ -91,6 +107,7 @@ class ChromeDownloader:
         self.download(ChromeDownloader.Component.CHROMEDRIVER, chromedriver_root)
         self.download(ChromeDownloader.Component.CHROME, chromedriver_root / chrome_subdir)
 
+    @traced('chromedownloader.download', 'what', 'where')
     def download(self, what: Component, where: str | Path) -> None:
         """
         Download single component
@@ -100,11 +117,14 @@ class ChromeDownloader:
         url = next(item for item in self.downloads[what] if item['platform'] == self.platform_name)['url']
         log.debug(f'Downloading {what} from {url}')
         if url:
-            response = requests.get(url)
-            response.raise_for_status()
+            with span('chromedownloader.fetch', url=url) as current:
+                response = requests.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                current.set_attribute('bytes', len(response.content))
             archive_dir = f'{what}-{self.platform_name}'
 
-            unpack(response.content, archive_dir, where)
+            with span('chromedownloader.unpack', archive_dir=archive_dir):
+                unpack(response.content, archive_dir, where)
         else:
             log.error(f'Cannot obtain download url of {what} for {self.platform_name}')
             raise RuntimeError(f'Cannot obtain download url of {what} for {self.platform_name}')
@@ -0,0 +1,415 @@
+"""
+    Long-lived Chrome and chromedriver shared by browser instances of many processes
+
+    Usage: python -m browser.daemon {start,stop,status,run} [--root-path PATH] [--chrome-path PATH] [--headless]
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import urllib.request
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from time import monotonic, sleep, time
+from typing import TYPE_CHECKING, Any
+
+from .log import setup_logging
+
+if TYPE_CHECKING:
+    from .browseroptions import BrowserOptions
+
+log = setup_logging(__name__)
+
+DEFAULT_STATE_FILE = Path(tempfile.gettempdir(), 'browser-daemon.json')
+# Time allowed for Chrome and chromedriver to start answering
+STARTUP_TIMEOUT = 30
+# Time allowed for daemon processes to exit on SIGTERM before they are killed
+STOP_TIMEOUT = 10
+# A start lock older than this is considered left over by a crashed process
+_STALE_LOCK_AGE = 60
+
+
+@dataclass
+class DaemonState:
+    """
+    Running daemon processes, persisted in the state file
+    """
+    chrome_pid: int
+    chromedriver_pid: int
+    debugging_port: int
+    chromedriver_port: int
+    user_data_dir: str
+    started: float
+    # process start times (see _process_start), telling the daemon processes from later ones reusing their pids
+    chrome_start: str | None = None
+    chromedriver_start: str | None = None
+
+    @property
+    def debugger_address(self) -> str:
+        """
+        :return: Chrome remote debugging address
+        """
+        return f'127.0.0.1:{self.debugging_port}'
+
+    @property
+    def chromedriver_url(self) -> str:
+        """
+        :return: chromedriver URL
+        """
+        return f'http://127.0.0.1:{self.chromedriver_port}'
+
+
+def _get_json(url: str, timeout: float = 2) -> Any:
+    """
+    :param url: URL
+    :param timeout: request timeout
+    :return: decoded JSON response
+    """
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.load(response)
+
+
+class CdpConnection:
+    """
+    Minimal CDP client connected to the Chrome browser target, used for commands page sessions cannot send
+    (browser context management) and for driving tabs without going through chromedriver
+    """
+
+    def __init__(self, debugger_address: str) -> None:
+        """
+        Connect to the browser target
+        :param debugger_address: Chrome remote debugging address
+        """
+        # websocket-client is a Selenium dependency
+        import websocket
+
+        url = _get_json(f'http://{debugger_address}/json/version')['webSocketDebuggerUrl']
+        self._socket = websocket.create_connection(url, timeout=STARTUP_TIMEOUT)
+        self._id = 0
+        # the connection is shared by the threads using the browser (e.g. a watchdog)
+        self._lock = threading.Lock()
+
+    def execute(self, method: str, params: dict[str, Any] | None = None, session_id: str = '') -> dict[str, Any]:
+        """
+        Execute a CDP command
+        :param method: command name
+        :param params: command parameters
+        :param session_id: session of a target attached with 'Target.attachToTarget' (flatten mode), to send the
+            command to that target instead of the browser
+        :return: command result
+        """
+        message: dict[str, Any] = {'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        with self._lock:
+            self._id += 1
+            self._socket.send(json.dumps({'id': self._id, **message}))
+            while True:
+                message = json.loads(self._socket.recv())
+                if message.get('id') != self._id:
+                    # events are not subscribed to, anything else is a stale response
+                    continue
+                if 'error' in message:
+                    raise RuntimeError(f'CDP command {method} failed: {message["error"]}')
+                return message.get('result', {})  # type: ignore[no-any-return]
+
+    def close(self) -> None:
+        """
+            Close the connection.
+        """
+        self._socket.close()
+
+
+class BrowserDaemon:
+    """
+    Keeps one Chrome (with remote debugging enabled) and one chromedriver running in the background, detached from
+    the process that started them. Browser instances created with BrowserOptions.daemon attach to them instead of
+    launching their own, and get a separate browser context (cookies, storage, cache) each.
+    """
+
+    def __init__(self, options: 'BrowserOptions', state_file: str | Path = DEFAULT_STATE_FILE,
+                 debugging_port: int = 9222, chromedriver_port: int = 9515) -> None:
+        """
+        Class constructor
+        :param options: options providing Chrome and chromedriver location and Chrome switches
+        :param state_file: file storing the running daemon state
+        :param debugging_port: Chrome remote debugging port
+        :param chromedriver_port: chromedriver port
+        """
+        self.options = options
+        self.state_file = Path(state_file)
+        self.debugging_port = debugging_port
+        self.chromedriver_port = chromedriver_port
+
+    def __repr__(self) -> str:
+        """
+            Return string representation of the object.
+        """
+        return f'BrowserDaemon(state_file={self.state_file}, debugging_port={self.debugging_port}, ' \
+               f'chromedriver_port={self.chromedriver_port})'
+
+    def state(self) -> DaemonState | None:
+        """
+        :return: state of the daemon started last, or None if there is none
+        """
+        try:
+            with open(self.state_file, encoding='utf-8') as state_file:
+                return DaemonState(**json.load(state_file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def healthy(state: DaemonState | None) -> bool:
+        """
+        Check if both processes answer
+        :param state: daemon state
+        :return: True if Chrome and chromedriver are usable
+        """
+        if state is None:
+            return False
+        try:
+            _get_json(f'http://{state.debugger_address}/json/version')
+            return bool(_get_json(f'{state.chromedriver_url}/status')['value']['ready'])
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def ensure(self) -> DaemonState:
+        """
+        Return the running daemon, (re)launching it if it is not running or not healthy
+        :return: daemon state
+        """
+        state = self.state()
+        if self.healthy(state):
+            return state  # type: ignore[return-value]
+        with self._start_lock():
+            # another process may have started the daemon while we were waiting for the lock
+            state = self.state()
+            if self.healthy(state):
+                return state  # type: ignore[return-value]
+            if state is not None:
+                log.warning('Browser daemon is not healthy, relaunching')
+                self.stop()
+            return self._launch()
+
+    def _launch(self) -> DaemonState:
+        """
+        Launch Chrome and chromedriver
+        :return: daemon state
+        """
+        user_data_dir = Path(tempfile.gettempdir(), 'browser-daemon-profile')
+        switches = [option for option in self.options.driver_options if not option.startswith('user-data-dir=')]
+        chrome = [self.options.chrome_location or 'chrome', f'--remote-debugging-port={self.debugging_port}',
+                  f'--user-data-dir={user_data_dir}', '--no-first-run', '--no-default-browser-check',
+                  *(f'--{switch}' for switch in switches), 'about:blank']
+        chromedriver = [self.options.chromedriver_location or 'chromedriver', f'--port={self.chromedriver_port}']
+        log.debug(f'Launching browser daemon: {chrome}, {chromedriver}')
+        # new sessions detach the processes from the terminal and the process group of the caller
+        detached: dict[str, Any] = {'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL,
+                                    'stdin': subprocess.DEVNULL}
+        if sys.platform == 'win32':
+            detached['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+        else:
+            detached['start_new_session'] = True
+        chrome_process = subprocess.Popen(chrome, **detached)
+        chromedriver_process = subprocess.Popen(chromedriver, **detached)
+        state = DaemonState(chrome_process.pid, chromedriver_process.pid, self.debugging_port,
+                            self.chromedriver_port, str(user_data_dir), time(),
+                            _process_start(chrome_process.pid), _process_start(chromedriver_process.pid))
+        deadline = monotonic() + STARTUP_TIMEOUT
+        while not self.healthy(state):
+            if monotonic() > deadline:
+                self._kill(state)
+                raise RuntimeError(f'Browser daemon did not start within {STARTUP_TIMEOUT}(s)')
+            sleep(0.1)
+        temporary = self.state_file.with_name(f'{self.state_file.name}.tmp')
+        with open(temporary, 'w', encoding='utf-8') as state_file:
+            json.dump(asdict(state), state_file)
+        os.replace(temporary, self.state_file)
+        log.debug(f'Browser daemon started: {state}')
+        return state
+
+    def _start_lock(self) -> '_StartLock':
+        """
+        :return: inter-process lock serializing daemon launches
+        """
+        return _StartLock(self.state_file.with_name(f'{self.state_file.name}.lock'))
+
+    @staticmethod
+    def _kill(state: DaemonState) -> None:
+        """
+        Terminate daemon processes and wait until they exit, so a relaunched Chrome does not find the port or the
+        profile still held; processes ignoring SIGTERM for STOP_TIMEOUT are killed. A pid whose process is not the
+        one recorded in the state (the state file outlived it and the pid was reused) is left alone.
+        :param state: daemon state
+        """
+        recorded = ((state.chromedriver_pid, state.chromedriver_start), (state.chrome_pid, state.chrome_start))
+        pids = [pid for pid, started in recorded if _same_process(pid, started)]
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        deadline = monotonic() + STOP_TIMEOUT
+        while any(_alive(pid) for pid in pids):
+            if monotonic() > deadline:
+                log.warning(f'Browser daemon processes did not exit within {STOP_TIMEOUT}(s), killing them')
+                for pid, started in recorded:
+                    if pid not in pids or not _same_process(pid, started):
+                        continue
+                    try:
+                        os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+                    except OSError:
+                        pass
+                deadline = monotonic() + STOP_TIMEOUT
+                while any(_alive(pid) for pid in pids) and monotonic() < deadline:
+                    sleep(0.1)
+                return
+            sleep(0.1)
+
+    def stop(self) -> None:
+        """
+            Terminate the daemon processes and remove the state file.
+        """
+        state = self.state()
+        if state is not None:
+            self._kill(state)
+            log.debug(f'Browser daemon stopped: {state}')
+        self.state_file.unlink(missing_ok=True)
+
+
+def _process_start(pid: int) -> str | None:
+    """
+    :param pid: process id
+    :return: start time of the process in clock ticks since boot, '' if there is no such process, or None if it
+        cannot be told on this platform (no /proc)
+    """
+    if not os.path.isdir('/proc/self'):
+        return None
+    try:
+        with open(f'/proc/{pid}/stat', encoding='utf-8') as stat_file:
+            # fields after the parenthesized command name, the first one being field 3 (state)
+            return stat_file.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return ''
+
+
+def _same_process(pid: int, started: str | None) -> bool:
+    """
+    Check if a pid still belongs to the process recorded with it
+    :param pid: process id
+    :param started: start time recorded by _process_start() when the process was launched
+    :return: True if the process runs and has the recorded start time; without /proc the pid is trusted
+    """
+    current = _process_start(pid)
+    if current is None:
+        return _alive(pid)
+    return bool(current) and current == started
+
+
+def _alive(pid: int) -> bool:
+    """
+    :param pid: process id
+    :return: True if the process is running; exited children of this process are reaped
+    """
+    if os.name != 'nt':
+        try:
+            if os.waitpid(pid, os.WNOHANG)[0] == pid:
+                return False
+        except ChildProcessError:
+            # not a child of this process
+            pass
+        try:
+            # zombies of other parents still accept signals
+            with open(f'/proc/{pid}/stat', encoding='utf-8') as stat_file:
+                if stat_file.read().rsplit(')', 1)[1].split()[0] == 'Z':
+                    return False
+        except (OSError, IndexError):
+            pass
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+class _StartLock:
+    """
+    Lock file created exclusively, waited for if held by another process
+    """
+
+    def __init__(self, path: Path) -> None:
+        """
+            Initialize the lock with its file path.
+        """
+        self.path = path
+
+    def __enter__(self) -> None:
+        """
+            Acquire the lock.
+        """
+        deadline = monotonic() + STARTUP_TIMEOUT * 2
+        while True:
+            try:
+                os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+                return
+            except FileExistsError:
+                try:
+                    if time() - self.path.stat().st_mtime > _STALE_LOCK_AGE:
+                        self.path.unlink(missing_ok=True)
+                        continue
+                except OSError:
+                    continue
+            if monotonic() > deadline:
+                raise RuntimeError(f'Timeout waiting for browser daemon start lock "{self.path}"')
+            sleep(0.1)
+
+    def __exit__(self, *args: Any) -> None:
+        """
+            Release the lock.
+        """
+        self.path.unlink(missing_ok=True)
+
+
+def main() -> int:
+    """
+    Manage the browser daemon
+    :return: process exit code
+    """
+    # imported here, so that importing this module from BrowserOptions users stays cheap
+    from .browseroptions import BrowserOptions
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('start', 'stop', 'status', 'run'),
+                        help='"run" starts the daemon and keeps relaunching it until interrupted')
+    parser.add_argument('--root-path', default=str(Path(__file__).resolve().parent), help='BrowserOptions root path')
+    parser.add_argument('--chrome-path', default='', help='Chrome path override')
+    parser.add_argument('--headless', action='store_true', help='run Chrome in headless mode')
+    parser.add_argument('--state-file', default=str(DEFAULT_STATE_FILE), help='daemon state file')
+    parser.add_argument('--interval', type=float, default=5.0, help='health check interval of "run"')
+    args = parser.parse_args()
+
+    daemon = BrowserDaemon(BrowserOptions(args.root_path, args.headless, False, args.chrome_path), args.state_file)
+    if args.command == 'stop':
+        daemon.stop()
+    elif args.command == 'status':
+        state = daemon.state()
+        print(json.dumps({'healthy': daemon.healthy(state), **(asdict(state) if state else {})}, indent=2))
+        return 0 if daemon.healthy(state) else 1
+    else:
+        print(json.dumps(asdict(daemon.ensure()), indent=2))
+        if args.command == 'run':
+            try:
+                while True:
+                    sleep(args.interval)
+                    daemon.ensure()
+            except KeyboardInterrupt:
+                daemon.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
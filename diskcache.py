@@ -0,0 +1,168 @@
+"""
+    Persistent, size-bounded Chrome HTTP disk cache shared across runs
+"""
+import os
+from dataclasses import dataclass
+from itertools import count
+from pathlib import Path
+from typing import Any
+
+from .log import setup_logging
+
+log = setup_logging(__name__)
+
+_LOCK_FILE = '.lock'
+# Cache index files are small and deleting them makes Chrome rebuild the index, so they are never trimmed
+_PROTECTED_FILES = ('index', _LOCK_FILE)
+
+
+def _pid_alive(pid: int) -> bool:
+    """
+    :param pid: process id
+    :return: True if the process is running; always True on Windows, where it cannot be checked safely
+    """
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class DiskCache:
+    """
+    Chrome HTTP cache directory that outlives the throwaway user data dir.
+
+    Chrome cannot share a cache directory between running instances, so the directory is split into slots, each
+    used by one browser at a time and guarded by a lock file. Slots are trimmed to max_bytes, least recently used
+    files first, before a browser starts using them and after it quits.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int = 512 * 2 ** 20) -> None:
+        """
+        Class constructor
+        :param directory: cache root directory
+        :param max_bytes: size limit of a single slot; also passed to Chrome as its cache size limit
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def __repr__(self) -> str:
+        """
+            Return string representation of the object.
+        """
+        return f'DiskCache(directory={self.directory}, max_bytes={self.max_bytes})'
+
+    def acquire(self) -> Path:
+        """
+        Lock a free slot, trimming it first
+        :return: slot directory to pass to Chrome as 'disk-cache-dir'
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for index in count():
+            slot = self.directory.joinpath(f'slot-{index}')
+            slot.mkdir(exist_ok=True)
+            lock = slot.joinpath(_LOCK_FILE)
+            try:
+                descriptor = os.open(lock, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+            except FileExistsError:
+                try:
+                    owner = int(lock.read_text() or 0)
+                except (OSError, ValueError):
+                    continue
+                if owner and not _pid_alive(owner):
+                    log.debug(f'Removing stale cache lock of process {owner} in "{slot}"')
+                    lock.unlink(missing_ok=True)
+                    try:
+                        descriptor = os.open(lock, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+                    except FileExistsError:
+                        # another process took over the stale slot first
+                        continue
+                else:
+                    continue
+            with os.fdopen(descriptor, 'w') as lock_file:
+                lock_file.write(str(os.getpid()))
+            self.trim(slot)
+            return slot
+        raise AssertionError('unreachable')
+
+    def release(self, slot: Path) -> None:
+        """
+        Trim a slot and unlock it; call after the browser using it has quit
+        :param slot: slot returned by acquire()
+        """
+        self.trim(slot)
+        slot.joinpath(_LOCK_FILE).unlink(missing_ok=True)
+
+    def trim(self, slot: Path) -> int:
+        """
+        Delete least recently used files until the slot fits within max_bytes
+        :param slot: slot directory
+        :return: number of bytes freed
+        """
+        files: list[tuple[float, int, Path]] = []
+        total = 0
+        for root, _, names in os.walk(slot):
+            for name in names:
+                if name in _PROTECTED_FILES:
+                    continue
+                path = Path(root, name)
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                # access time alone is unreliable on filesystems mounted with 'relatime' or 'noatime'
+                files.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+                total += stat.st_size
+        freed = 0
+        for _, size, path in sorted(files, key=lambda item: item[0]):
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                freed += size
+            except OSError:
+                pass
+        if freed:
+            log.debug(f'Trimmed {freed} bytes from "{slot}"')
+        return freed
+
+
+@dataclass
+class CacheStats:
+    """
+    HTTP cache usage counted from CDP 'Network.responseReceived' and 'Network.loadingFinished' events
+    """
+    responses: int = 0
+    disk_cache_hits: int = 0
+    bytes_from_network: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        :return: share of responses served from the disk cache
+        """
+        return self.disk_cache_hits / self.responses if self.responses else 0.0
+
+    def handle_event(self, method: str, params: dict[str, Any]) -> None:
+        """
+        Update counters with a CDP event
+        :param method: event name
+        :param params: event parameters
+        """
+        if method == 'Network.responseReceived':
+            self.responses += 1
+            if params.get('response', {}).get('fromDiskCache'):
+                self.disk_cache_hits += 1
+        elif method == 'Network.loadingFinished':
+            self.bytes_from_network += int(params.get('encodedDataLength', 0))
+
+    def __str__(self) -> str:
+        """
+            Return a one-line summary.
+        """
+        return f'{self.responses} responses, {self.disk_cache_hits} from disk cache ({self.hit_ratio:.1%}), ' \
+               f'{self.bytes_from_network} bytes from network'
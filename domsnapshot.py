@@ -0,0 +1,244 @@
+"""
+    Incremental page source snapshots: a full baseline followed by diffs against the previous snapshot
+
+    Usage: python -m browser.domsnapshot <snapshot.htmldiff> [<snapshot.htmldiff> ...] [--output-dir DIR]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from bisect import bisect_left
+from collections import Counter
+from enum import StrEnum
+from pathlib import Path
+
+DIFF_EXTENSION = 'htmldiff'
+# Split the page source after every tag end, so minified single-line documents diff at tag granularity
+_TOKEN_RE = re.compile(r'[^>]*>|[^>]+$')
+
+
+class SnapshotMode(StrEnum):
+    """
+    Page source snapshot mode for trace logs
+    """
+    FULL = 'full'
+    DIFF = 'diff'
+
+
+def tokenize(html: str) -> list[str]:
+    """
+    Split HTML into tokens ending with '>'
+    :param html: page source
+    :return: tokens, joining them gives back the page source
+    """
+    return _TOKEN_RE.findall(html)
+
+
+def _unique_anchors(previous: list[str], current: list[str]) -> list[tuple[int, int]]:
+    """
+    Find tokens occurring exactly once in both sequences, keeping the longest subset in the same order in both
+    :param previous: previous tokens
+    :param current: current tokens
+    :return: (previous index, current index) pairs, increasing in both
+    """
+    previous_counts = Counter(previous)
+    current_counts = Counter(current)
+    positions = {token: index for index, token in enumerate(previous) if previous_counts[token] == 1}
+    pairs = [(positions[token], index) for index, token in enumerate(current)
+             if current_counts[token] == 1 and token in positions]
+    # longest increasing subsequence of previous indexes, O(n log n)
+    tails: list[int] = []
+    tail_pairs: list[int] = []
+    links = [-1] * len(pairs)
+    for number, (index, _) in enumerate(pairs):
+        position = bisect_left(tails, index)
+        if position:
+            links[number] = tail_pairs[position - 1]
+        if position == len(tails):
+            tails.append(index)
+            tail_pairs.append(number)
+        else:
+            tails[position] = index
+            tail_pairs[position] = number
+    result = []
+    number = tail_pairs[-1] if tail_pairs else -1
+    while number >= 0:
+        result.append(pairs[number])
+        number = links[number]
+    return result[::-1]
+
+
+def diff(previous: list[str], current: list[str], max_changed: float = 0.5,
+         max_cost: int = 20) -> list[list[object]] | None:
+    """
+    Compute operations rebuilding current tokens from the previous ones, patience diff style: the common prefix and
+    suffix of a range are matched first, then tokens unique in both sides of the rest serve as anchors whose
+    matching runs are extended, and the gaps between the runs are matched the same way. Unlike a longest common
+    subsequence search, this stays close to linear on HTML's many repeated tokens.
+    :param previous: previous tokens
+    :param current: current tokens
+    :param max_changed: fraction of current tokens above which the diff is abandoned
+    :param max_cost: token comparisons allowed per token of both documents before the diff is abandoned
+    :return: list of ['=', start, end] (copy previous[start:end]) and ['+', tokens] (insert tokens) operations, or
+        None if the diff was abandoned and a full snapshot should be written instead
+    """
+    budget = max_cost * (len(previous) + len(current) + 1)
+    # Matching blocks (previous start, current start, length)
+    blocks: list[tuple[int, int, int]] = []
+    ranges = [(0, len(previous), 0, len(current))]
+    while ranges:
+        old_low, old_high, new_low, new_high = ranges.pop()
+        prefix = 0
+        limit = min(old_high - old_low, new_high - new_low)
+        while prefix < limit and previous[old_low + prefix] == current[new_low + prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and previous[old_high - suffix - 1] == current[new_high - suffix - 1]:
+            suffix += 1
+        budget -= prefix + suffix + old_high - old_low + new_high - new_low
+        if budget < 0:
+            return None
+        if prefix:
+            blocks.append((old_low, new_low, prefix))
+        if suffix:
+            blocks.append((old_high - suffix, new_high - suffix, suffix))
+        old_low, old_high, new_low, new_high = old_low + prefix, old_high - suffix, new_low + prefix, new_high - suffix
+        if old_low == old_high or new_low == new_high:
+            continue
+        # a run extended forward past later anchors makes them redundant
+        old_end, new_end = old_low, new_low
+        for old_index, new_index in _unique_anchors(previous[old_low:old_high], current[new_low:new_high]):
+            old_index += old_low
+            new_index += new_low
+            if old_index < old_end or new_index < new_end:
+                continue
+            before = 0
+            while old_index - before > old_end and new_index - before > new_end \
+                    and previous[old_index - before - 1] == current[new_index - before - 1]:
+                before += 1
+            after = 1
+            while old_index + after < old_high and new_index + after < new_high \
+                    and previous[old_index + after] == current[new_index + after]:
+                after += 1
+            budget -= before + after
+            blocks.append((old_index - before, new_index - before, before + after))
+            if old_index - before > old_end and new_index - before > new_end:
+                ranges.append((old_end, old_index - before, new_end, new_index - before))
+            old_end, new_end = old_index + after, new_index + after
+        if old_end > old_low and old_end < old_high and new_end < new_high:
+            # the gap after the last anchor; a range without anchors is left as an insertion
+            ranges.append((old_end, old_high, new_end, new_high))
+
+    operations: list[list[object]] = []
+    inserted = 0
+    new_end = 0
+    for old_start, new_start, length in sorted(blocks, key=lambda block: block[1]) + [(0, len(current), 0)]:
+        if new_start > new_end:
+            operations.append(['+', current[new_end:new_start]])
+            inserted += new_start - new_end
+        if length:
+            if operations and operations[-1][0] == '=' and operations[-1][2] == old_start:
+                operations[-1][2] = old_start + length
+            else:
+                operations.append(['=', old_start, old_start + length])
+        new_end = new_start + length
+    if inserted > max_changed * len(current):
+        return None
+    return operations
+
+
+def rebuild(path: str | Path) -> str:
+    """
+    Rebuild the full page source of a snapshot
+    :param path: snapshot file, either a full '.html' one or a '.htmldiff' one
+    :return: page source
+    """
+    path = Path(path)
+    chain = []
+    while path.suffix == f'.{DIFF_EXTENSION}':
+        with open(path, encoding='utf-8') as diff_file:
+            snapshot = json.load(diff_file)
+        chain.append(snapshot['ops'])
+        path = path.with_name(snapshot['base'])
+    with open(path, encoding='utf-8') as baseline_file:
+        tokens = tokenize(baseline_file.read())
+    for operations in reversed(chain):
+        rebuilt: list[str] = []
+        for operation in operations:
+            if operation[0] == '=':
+                rebuilt += tokens[operation[1]:operation[2]]
+            else:
+                rebuilt += operation[1]
+        tokens = rebuilt
+    return ''.join(tokens)
+
+
+class DomSnapshotter:
+    """
+    Writes page source snapshots of a single WebLogger. The first snapshot, and every baseline_interval-th one after
+    it, is saved in full; the others are saved as a diff against the previous snapshot, so that consecutive steps of
+    a single-page application cost only the part of the DOM that actually changed. A snapshot changing most of the
+    page is saved in full as well, and starts a new baseline.
+    """
+
+    def __init__(self, baseline_interval: int = 50) -> None:
+        """
+        Class constructor
+        :param baseline_interval: number of snapshots after which a new full baseline is written
+        """
+        self.baseline_interval = baseline_interval
+        self._previous: list[str] | None = None
+        self._previous_file = ''
+        self._since_baseline = 0
+
+    def write(self, filename: str, html: str) -> str:
+        """
+        Write a snapshot
+        :param filename: output file name without extension
+        :param html: page source
+        :return: name of the file written
+        """
+        tokens = tokenize(html)
+        operations = None
+        if self._previous is not None and self._since_baseline < self.baseline_interval:
+            operations = diff(self._previous, tokens)
+        if operations is None:
+            output = f'{filename}.html'
+            with open(output, 'w', encoding='utf-8') as snapshot_file:
+                snapshot_file.write(html)
+            self._since_baseline = 0
+        else:
+            output = f'{filename}.{DIFF_EXTENSION}'
+            with open(output, 'w', encoding='utf-8') as snapshot_file:
+                json.dump({'base': self._previous_file, 'ops': operations}, snapshot_file,
+                          separators=(',', ':'))
+            self._since_baseline += 1
+        self._previous = tokens
+        self._previous_file = os.path.basename(output)
+        return output
+
+
+def main() -> int:
+    """
+    Rebuild full page sources from diff snapshots
+    :return: process exit code
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('snapshots', nargs='+', help='snapshot files to rebuild')
+    parser.add_argument('--output-dir', help='write rebuilt files here instead of next to the snapshots')
+    args = parser.parse_args()
+    for snapshot in map(Path, args.snapshots):
+        output_dir = Path(args.output_dir) if args.output_dir else snapshot.parent
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output = output_dir.joinpath(f'{snapshot.stem}.html')
+        if output.resolve() == snapshot.resolve():
+            continue
+        with open(output, 'w', encoding='utf-8') as output_file:
+            output_file.write(rebuild(snapshot))
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+    Event-driven file download management
+"""
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+from selenium.common.exceptions import TimeoutException
+
+from .log import setup_logging
+from .tracing import traced
+
+if TYPE_CHECKING:
+    from .browser import Browser
+
+log = setup_logging(__name__)
+
+# Delay between reads of the CDP event log while waiting for downloads
+EVENT_POLL_INTERVAL = 0.1
+
+
+@dataclass
+class Download:
+    """
+    Single download state, updated from CDP events
+    """
+    guid: str
+    url: str = ''
+    suggested_filename: str = ''
+    state: str = 'inProgress'
+    received_bytes: int = 0
+    total_bytes: int = 0
+    path: Path | None = None
+    started: float = field(default_factory=monotonic)
+
+    @property
+    def done(self) -> bool:
+        """
+        :return: True if the download has completed or was canceled
+        """
+        return self.state in ('completed', 'canceled')
+
+    @property
+    def size(self) -> int:
+        """
+        :return: size of the downloaded file, 0 until the download has completed
+        """
+        return self.path.stat().st_size if self.path is not None and self.path.exists() else 0
+
+
+ProgressCallback = Callable[[Download], None]
+
+
+class DownloadManager:
+    """
+    Routes a browser's downloads into its own directory and follows them through CDP 'downloadWillBegin' and
+    'downloadProgress' events, so completion is detected without watching the directory for '.crdownload' files.
+
+    Files are stored under their download GUIDs while in progress, so several downloads of the same file name can
+    run at once, and renamed to the name suggested by the server once completed.
+
+    Usage:
+        download = browser.downloads.expect(lambda: browser.safe_click(By.ID, 'export'), timeout=60)
+        print(download.path, download.size)
+    """
+
+    def __init__(self, browser: 'Browser', directory: str | Path | None = None) -> None:
+        """
+        Class constructor
+        :param browser: browser started with BrowserOptions.performance_log enabled
+        :param directory: download directory (default: new temporary directory)
+        """
+        if browser.cdp_events is None:
+            raise RuntimeError('Download management requires BrowserOptions.performance_log')
+        self.browser = browser
+        self.directory = Path(directory) if directory else Path(tempfile.mkdtemp(prefix='downloads-'))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.downloads: dict[str, Download] = {}
+        self._progress_callbacks: list[ProgressCallback] = []
+        behavior = {'behavior': 'allowAndName', 'downloadPath': str(self.directory.resolve()), 'eventsEnabled': True}
+        if browser.browser_context_id:
+            # a browser attached to a daemon only routes the downloads of its own context
+            behavior['browserContextId'] = browser.browser_context_id
+        browser.execute_cdp_cmd('Browser.setDownloadBehavior', behavior)
+        # Page domain events are recorded by chromedriver, Browser domain ones are handled in case they are as well
+        for prefix in ('Page.download', 'Browser.download'):
+            browser.cdp_events.subscribe(prefix, self._handle_event)
+
+    def _handle_event(self, method: str, params: dict[str, Any]) -> None:
+        """
+        Update download state with a CDP event
+        :param method: event name
+        :param params: event parameters
+        """
+        guid = params['guid']
+        download = self.downloads.setdefault(guid, Download(guid))
+        if method.endswith('downloadWillBegin'):
+            download.url = params.get('url', '')
+            download.suggested_filename = params.get('suggestedFilename', '')
+            log.debug(f'Download {guid} of "{download.url}" started')
+            return
+        download.state = params.get('state', download.state)
+        download.received_bytes = int(params.get('receivedBytes', download.received_bytes))
+        download.total_bytes = int(params.get('totalBytes', download.total_bytes))
+        if download.state == 'completed' and download.path is None:
+            download.path = self._finalize(download)
+            log.debug(f'Download {guid} completed: "{download.path}" ({download.received_bytes} bytes)')
+        for callback in self._progress_callbacks:
+            callback(download)
+
+    def _finalize(self, download: Download) -> Path:
+        """
+        Rename a completed download from its GUID to the suggested file name, avoiding overwriting existing files
+        :param download: completed download
+        :return: final path
+        """
+        source = self.directory.joinpath(download.guid)
+        if not download.suggested_filename or not source.exists():
+            return source
+        name = Path(download.suggested_filename).name
+        target = self.directory.joinpath(name)
+        index = 1
+        while target.exists():
+            target = self.directory.joinpath(f'{Path(name).stem} ({index}){Path(name).suffix}')
+            index += 1
+        return source.rename(target)
+
+    def on_progress(self, callback: ProgressCallback) -> None:
+        """
+        Register a callback called on every progress event of any download
+        :param callback: callable receiving the download
+        """
+        self._progress_callbacks.append(callback)
+
+    @traced('downloads.wait', 'timeout')
+    def wait(self, downloads: Iterable[Download | str], timeout: int | None = None,
+             progress: ProgressCallback | None = None) -> list[Download]:
+        """
+        Wait until downloads complete
+        :param downloads: downloads or their GUIDs
+        :param timeout: timeout or None if the browser default timeout should be used
+        :param progress: callback called on progress events of these downloads
+        :return: downloads
+        :raises TimeoutException if any download did not complete in time; RuntimeError if any was canceled
+        """
+        guids = [item.guid if isinstance(item, Download) else item for item in downloads]
+        deadline = monotonic() + (timeout or self.browser.default_timeout)
+
+        def _progress(download: Download) -> None:
+            if progress is not None and download.guid in guids:
+                progress(download)
+
+        self._progress_callbacks.append(_progress)
+        try:
+            while True:
+                self.browser.cdp_events.poll()  # type: ignore[union-attr]
+                pending = [guid for guid in guids if not self.downloads.get(guid, Download(guid)).done]
+                if not pending:
+                    break
+                if monotonic() > deadline:
+                    for guid in pending:
+                        self.cancel(guid)
+                    raise TimeoutException(f'Timeout expired waiting for downloads: {", ".join(pending)}')
+                sleep(EVENT_POLL_INTERVAL)
+        finally:
+            self._progress_callbacks.remove(_progress)
+        result = [self.downloads[guid] for guid in guids]
+        canceled = [item.guid for item in result if item.state == 'canceled']
+        if canceled:
+            raise RuntimeError(f'Downloads canceled: {", ".join(canceled)}')
+        return result
+
+    def expect(self, action: Callable[[], Any], timeout: int | None = None, count: int = 1,
+               progress: ProgressCallback | None = None) -> Download:
+        """
+        Run an action triggering downloads (e.g. a click) and wait until they complete
+        :param action: callable starting the downloads
+        :param timeout: timeout for the downloads to start and complete, or None for the browser default timeout
+        :param count: number of downloads the action starts
+        :param progress: callback called on progress events of these downloads
+        :return: the first of the downloads started; all of them are available in self.downloads
+        :raises TimeoutException if the downloads did not start or complete in time
+        """
+        timeout = timeout or self.browser.default_timeout
+        deadline = monotonic() + timeout
+        self.browser.cdp_events.poll()  # type: ignore[union-attr]
+        known = set(self.downloads)
+        action()
+        while True:
+            self.browser.cdp_events.poll()  # type: ignore[union-attr]
+            started = [guid for guid in self.downloads if guid not in known]
+            if len(started) >= count:
+                break
+            if monotonic() > deadline:
+                raise TimeoutException(f'Timeout {timeout}(s) expired waiting for {count} download(s) to start')
+            sleep(EVENT_POLL_INTERVAL)
+        return self.wait(started, max(1, int(deadline - monotonic())), progress)[0]
+
+    def cancel(self, guid: str) -> None:
+        """
+        Cancel a download in progress
+        :param guid: download GUID
+        """
+        try:
+            self.browser.execute_cdp_cmd('Browser.cancelDownload', {'guid': guid})
+        except Exception as e:
+            log.debug(f'Cannot cancel download {guid}: {e}')
@@ -0,0 +1,83 @@
+"""
+    Named, composable sets of Chrome command line switches
+"""
+from enum import StrEnum
+from typing import Iterable
+
+
+class FlagProfile(StrEnum):
+    """
+    Chrome switch set name
+    """
+    # Options that potentially lower reCaptcha v3 (automatic bot detection) score, making some pages unusable
+    STEALTH = 'stealth'
+    # Skip background work unrelated to the page being automated
+    LEAN_THROUGHPUT = 'lean-throughput'
+    # Fewer renderer processes and smaller JS heaps at the cost of isolation between sites
+    LOW_MEMORY = 'low-memory'
+
+
+# Applied on top of the base switches of BrowserOptions (which include the ones every launch needs, e.g. 'no-sandbox');
+# site isolation is turned off with the 'disable-site-isolation-trials' switch, as 'site-per-process' is a switch and
+# not a feature name 'disable-features' would accept
+FLAG_PROFILES: dict[FlagProfile, list[str]] = {
+    FlagProfile.STEALTH: ['disable-gpu', 'disable-webgl', 'enable-unsafe-swiftshader'],
+    FlagProfile.LEAN_THROUGHPUT: [
+        'disable-background-networking',
+        'disable-component-update',
+        'disable-extensions',
+        'disable-default-apps',
+        'disable-sync',
+        'disable-client-side-phishing-detection',
+        'disable-hang-monitor',
+        'disable-prompt-on-repost',
+        'disable-domain-reliability',
+        'disable-background-timer-throttling',
+        'disable-backgrounding-occluded-windows',
+        'disable-renderer-backgrounding',
+        'disable-ipc-flooding-protection',
+        'disable-site-isolation-trials',
+        'metrics-recording-only',
+        'no-first-run',
+        'no-default-browser-check',
+        'mute-audio',
+        'disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication,'
+        'CertificateTransparencyComponentUpdater,IsolateOrigins',
+    ],
+    FlagProfile.LOW_MEMORY: [
+        'disable-background-networking',
+        'disable-component-update',
+        'disable-extensions',
+        'disable-site-isolation-trials',
+        'process-per-site',
+        'renderer-process-limit=2',
+        'js-flags=--max-old-space-size=512',
+        'disable-gpu',
+        'disable-features=IsolateOrigins,BackForwardCache',
+    ],
+}
+
+# Switches whose values are comma separated lists; Chrome honours only the last occurrence of such a switch, so values
+# coming from several profiles have to be merged into a single one
+_LIST_SWITCHES = ('disable-features', 'enable-features')
+
+
+def resolve_flags(profiles: Iterable[str]) -> list[str]:
+    """
+    Combine switches of the profiles provided, dropping duplicates and merging feature lists
+    :param profiles: profile names, see FlagProfile
+    :return: list of switches (without leading dashes)
+    """
+    flags: list[str] = []
+    lists: dict[str, list[str]] = {}
+    for profile in profiles:
+        for flag in FLAG_PROFILES[FlagProfile(profile)]:
+            name, _, value = flag.partition('=')
+            if name in _LIST_SWITCHES:
+                if name not in lists:
+                    lists[name] = []
+                    flags.append(name)
+                lists[name] += [item for item in value.split(',') if item not in lists[name]]
+            elif flag not in flags:
+                flags.append(flag)
+    return [f'{flag}={",".join(lists[flag])}' if flag in lists else flag for flag in flags]
@@ -0,0 +1,166 @@
+"""
+    Plain HTTP client sharing cookies and user agent with a live browser
+"""
+from http.cookiejar import Cookie, DefaultCookiePolicy
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .log import setup_logging
+from .tracing import traced
+
+if TYPE_CHECKING:
+    from .browser import Browser
+
+log = setup_logging(__name__)
+
+_CookieKey = tuple[str, str, str]
+
+
+class BrowserHttpClient:
+    """
+    Pooled 'requests' session for steps that do not need rendering, e.g. authenticated file downloads or JSON API
+    calls. Before every request the session cookies are replaced with the browser ones, and cookies set, changed or
+    deleted by the response are copied back into the browser, so both stay logged in (and logged out).
+    """
+
+    def __init__(self, browser: 'Browser', pool_size: int = 10, sync_cookies: bool = True) -> None:
+        """
+        Class constructor
+        :param browser: browser whose cookies and user agent are used
+        :param pool_size: maximum number of kept-alive connections per host
+        :param sync_cookies: synchronize cookies with the browser around every request
+        """
+        self.browser = browser
+        self.sync_cookies = sync_cookies
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = browser.user_agent
+        # host-only cookies (set without a Domain attribute) are not sent to subdomains, as in the browser
+        policy = DefaultCookiePolicy(strict_ns_domain=DefaultCookiePolicy.DomainStrictNonDomain)
+        self.session.cookies.set_policy(policy)
+        self._synced: dict[_CookieKey, str] = {}
+
+    def pull_cookies(self) -> None:
+        """
+            Replace session cookies with the browser cookies, so cookies the browser deleted are not sent either.
+        """
+        self._synced = {}
+        self.session.cookies.clear()
+        for cookie in self.browser.get_all_cookies():
+            self.session.cookies.set_cookie(_from_cdp(cookie))
+            self._synced[(cookie['domain'], cookie.get('path', '/'), cookie['name'])] = cookie['value']
+
+    def push_cookies(self) -> None:
+        """
+            Copy session cookies added, changed or deleted since the last pull_cookies() into the browser.
+        """
+        current = {(cookie.domain, cookie.path, cookie.name): cookie for cookie in self.session.cookies}
+        changed = [cookie for key, cookie in current.items() if self._synced.get(key) != cookie.value]
+        deleted = [key for key in self._synced if key not in current]
+        if changed:
+            log.debug(f'Copying {len(changed)} cookies into the browser')
+            self.browser.set_all_cookies([_to_cdp(cookie) for cookie in changed])
+            for cookie in changed:
+                self._synced[(cookie.domain, cookie.path, cookie.name)] = cookie.value or ''
+        if deleted:
+            log.debug(f'Deleting {len(deleted)} cookies from the browser')
+            for domain, path, name in deleted:
+                # 'domain' deletes the cookie with exactly this domain, host-only or not
+                self.browser.execute_cdp_cmd('Network.deleteCookies', {'name': name, 'domain': domain, 'path': path})
+                del self._synced[(domain, path, name)]
+
+    @traced('http.request', 'method', 'url')
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Send a request with the browser cookies
+        :param method: HTTP method
+        :param url: URL
+        :param kwargs: any requests.Session.request() arguments
+        :return: response
+        """
+        if self.sync_cookies:
+            self.pull_cookies()
+        response = self.session.request(method, url, **kwargs)
+        if self.sync_cookies:
+            self.push_cookies()
+        return response
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Send a GET request
+        :param url: URL
+        :param kwargs: any requests.Session.request() arguments
+        :return: response
+        """
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Send a POST request
+        :param url: URL
+        :param kwargs: any requests.Session.request() arguments
+        :return: response
+        """
+        return self.request('POST', url, **kwargs)
+
+    @traced('http.download', 'url', 'path')
+    def download(self, url: str, path: str | Path, chunk_size: int = 2 ** 20, **kwargs: Any) -> int:
+        """
+        Stream a response body into a file
+        :param url: URL
+        :param path: output file
+        :param chunk_size: size of chunks written at once
+        :param kwargs: any requests.Session.request() arguments
+        :return: number of bytes written
+        """
+        written = 0
+        with self.request('GET', url, stream=True, **kwargs) as response:
+            response.raise_for_status()
+            with open(path, 'wb') as output:
+                for chunk in response.iter_content(chunk_size):
+                    written += output.write(chunk)
+        return written
+
+    def close(self) -> None:
+        """
+            Close pooled connections.
+        """
+        self.session.close()
+
+
+def _from_cdp(cookie: dict[str, Any]) -> Cookie:
+    """
+    Convert a CDP 'Network.Cookie' into a cookie jar cookie; a domain without a leading dot is a host-only cookie
+    :param cookie: CDP cookie
+    :return: cookie
+    """
+    domain = cookie['domain']
+    expires = cookie.get('expires', -1)
+    session = bool(cookie.get('session')) or expires < 0
+    return Cookie(version=0, name=cookie['name'], value=cookie['value'], port=None, port_specified=False,
+                  domain=domain, domain_specified=domain.startswith('.'), domain_initial_dot=domain.startswith('.'),
+                  path=cookie.get('path', '/'), path_specified=True, secure=cookie.get('secure', False),
+                  expires=None if session else int(expires), discard=session, comment=None, comment_url=None,
+                  rest={'HttpOnly': ''} if cookie.get('httpOnly') else {})
+
+
+def _to_cdp(cookie: Cookie) -> dict[str, Any]:
+    """
+    Convert a cookie jar cookie into a CDP 'Network.CookieParam'
+    :param cookie: cookie
+    :return: CDP cookie; host-only cookies are given by URL, as a 'domain' would make them domain cookies
+    """
+    result: dict[str, Any] = {'name': cookie.name, 'value': cookie.value or '', 'path': cookie.path,
+                              'secure': cookie.secure, 'httpOnly': cookie.has_nonstandard_attr('HttpOnly')}
+    if cookie.domain_specified:
+        result['domain'] = cookie.domain
+    else:
+        result['url'] = f'{"https" if cookie.secure else "http"}://{cookie.domain}{cookie.path}'
+    if cookie.expires is not None:
+        result['expires'] = cookie.expires
+    return result
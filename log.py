@@ -1,11 +1,77 @@
 """
     Browser logging setup
+
+    By default every logger gets the same QueueHandler, and a single QueueListener thread writes records to one
+    handler per destination (console, file), so logging calls do not block on I/O.
 """
+import atexit
 import logging
 import os
+import queue
+import threading
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler
+from time import time
 
 from .logconfig import LOG_CONFIG
 
+# Maximum time records may stay in a batch before being written out, in seconds
+BATCH_FLUSH_INTERVAL = 1.0
+
+_sinks: list[logging.Handler] | None = None
+_queue_handler: QueueHandler | None = None
+_listener: QueueListener | None = None
+
+
+class _BatchingHandler(MemoryHandler):
+    """
+    Buffer records and pass them to the target handler in batches, when the buffer is full, a warning or error is
+    logged, or the oldest buffered record is older than BATCH_FLUSH_INTERVAL. A background thread writes out aged
+    records even if no other record arrives.
+    """
+
+    def __init__(self, capacity: int, target: logging.Handler) -> None:
+        """
+            Initialize the handler with a batch size and the target handler, start the flush thread.
+        """
+        super().__init__(capacity, flushLevel=logging.WARNING, target=target)
+        # set when a record is buffered, cleared by the flush thread (with the handler lock held) once it is empty
+        self._pending = threading.Event()
+        self._stopped = threading.Event()
+        threading.Thread(target=self._flush_aged, name='log-batch-flush', daemon=True).start()
+
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        """
+            Check if the buffer should be flushed after adding a record.
+        """
+        self._pending.set()
+        return super().shouldFlush(record) or time() - self.buffer[0].created >= BATCH_FLUSH_INTERVAL
+
+    def _flush_aged(self) -> None:
+        """
+            Flush the buffer whenever its oldest record gets older than BATCH_FLUSH_INTERVAL, until closed.
+        """
+        lock = self.lock
+        # created by Handler.__init__, only typed as optional
+        assert lock is not None
+        while self._pending.wait() and not self._stopped.is_set():
+            with lock:
+                if not self.buffer:
+                    self._pending.clear()
+                    continue
+                delay = self.buffer[0].created + BATCH_FLUSH_INTERVAL - time()
+            if delay > 0:
+                self._stopped.wait(delay)
+            else:
+                self.flush()
+
+    def close(self) -> None:
+        """
+            Write buffered records out and stop the flush thread.
+        """
+        self._stopped.set()
+        self._pending.set()
+        super().close()
+
 
 def _setup_handler(handler: logging.Handler,
                    level: str,
@@ -18,6 +84,64 @@ def _setup_handler(handler: logging.Handler,
     return handler
 
 
+def _get_sinks() -> list[logging.Handler]:
+    """
+    Create handlers writing to the configured destinations, once per process
+    :return: list of handlers
+    """
+    global _sinks
+    if _sinks is not None:
+        return _sinks
+    _sinks = []
+    if LOG_CONFIG.console:
+        _sinks.append(_setup_handler(logging.StreamHandler(),
+                                     LOG_CONFIG.level,
+                                     LOG_CONFIG.formatting))
+    if LOG_CONFIG.file:
+        if os.path.exists(LOG_CONFIG.file):
+            os.remove(LOG_CONFIG.file)
+        if LOG_CONFIG.max_bytes:
+            file_handler: logging.Handler = RotatingFileHandler(LOG_CONFIG.file, maxBytes=LOG_CONFIG.max_bytes,
+                                                                backupCount=LOG_CONFIG.backup_count,
+                                                                encoding='utf-8')
+        else:
+            file_handler = logging.FileHandler(LOG_CONFIG.file, encoding='utf-8')
+        _sinks.append(_setup_handler(file_handler, LOG_CONFIG.level, LOG_CONFIG.formatting))
+    if LOG_CONFIG.batch_size > 1:
+        _sinks[:] = [_setup_handler(_BatchingHandler(LOG_CONFIG.batch_size, sink),
+                                    LOG_CONFIG.level,
+                                    LOG_CONFIG.formatting) for sink in _sinks]
+    atexit.register(_close_sinks)
+    return _sinks
+
+
+def _get_queue_handler() -> QueueHandler:
+    """
+    Get the process-wide queue handler, starting its listener thread on first use
+    :return: queue handler
+    """
+    global _queue_handler, _listener
+    if _queue_handler is None:
+        records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        _queue_handler = QueueHandler(records)
+        _queue_handler.setLevel(LOG_CONFIG.level)
+        _listener = QueueListener(records, *_get_sinks(), respect_handler_level=True)
+        _listener.start()
+    return _queue_handler
+
+
+def _close_sinks() -> None:
+    """
+        Write out queued records and close all handlers at interpreter exit.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for sink in _sinks or []:
+        sink.close()
+
+
 def setup_logging(name: str) -> logging.Logger:
     """
     Setup browser logging
@@ -30,19 +154,12 @@ def setup_logging(name: str) -> logging.Logger:
     log.setLevel(LOG_CONFIG.level)
     if log.hasHandlers():
         log.handlers.clear()
-    handlers = []
-    if LOG_CONFIG.console:
-        handlers.append(_setup_handler(logging.StreamHandler(),
-                                       LOG_CONFIG.level,
-                                       LOG_CONFIG.formatting))
-    if LOG_CONFIG.file:
-        if not LOG_CONFIG.initialized and os.path.exists(LOG_CONFIG.file):
-            os.remove(LOG_CONFIG.file)
-        handlers.append(_setup_handler(logging.FileHandler(LOG_CONFIG.file, encoding='utf-8'),
-                                       LOG_CONFIG.level,
-                                       LOG_CONFIG.formatting))
-    for handler in handlers:
-        log.addHandler(handler)
+    if LOG_CONFIG.queue:
+        if LOG_CONFIG.console or LOG_CONFIG.file:
+            log.addHandler(_get_queue_handler())
+    else:
+        for handler in _get_sinks():
+            log.addHandler(handler)
 
     LOG_CONFIG.initialized = True
     return log
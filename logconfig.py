@@ -5,8 +5,6 @@ import logging
 import os
 from dataclasses import dataclass
 
-from str_to_bool import str_to_bool
-
 
 @dataclass
 class EnvironmentValue:
@@ -47,12 +45,18 @@ class LogConfig:
         self._formatting = EnvironmentValue('BROWSER_LOG_FORMATTING', '%(levelname)s:%(name)s %(asctime)s %(message)s')
         self._console = EnvironmentValue('BROWSER_LOG_TO_CONSOLE', 'True')
         self._file = EnvironmentValue('BROWSER_LOG_FILENAME', '')
+        self._queue = EnvironmentValue('BROWSER_LOG_QUEUE', 'True')
+        self._batch_size = EnvironmentValue('BROWSER_LOG_BATCH_SIZE', '1')
+        self._max_bytes = EnvironmentValue('BROWSER_LOG_MAX_BYTES', '0')
+        self._backup_count = EnvironmentValue('BROWSER_LOG_BACKUP_COUNT', '3')
+        self._trace_file = EnvironmentValue('BROWSER_TRACE_FILENAME', '')
 
     @property
     def console(self) -> bool:
         """
         :return: True if logs should be printed into the console (default), False otherwise
         """
+        from str_to_bool import str_to_bool  # imported on first use to keep package import fast
         return bool(str_to_bool(self._console.value))
 
     @property
@@ -62,6 +66,54 @@ class LogConfig:
         """
         return self._file.value
 
+    @property
+    def queue(self) -> bool:
+        """
+        :return: True if records should be written by a background thread (default), False otherwise
+        """
+        from str_to_bool import str_to_bool  # imported on first use to keep package import fast
+        return bool(str_to_bool(self._queue.value))
+
+    @property
+    def batch_size(self) -> int:
+        """
+        :return: Number of records buffered before they are written out
+        """
+        return self._non_negative_int(self._batch_size)
+
+    @property
+    def max_bytes(self) -> int:
+        """
+        :return: Log file size triggering rotation, 0 disables rotation
+        """
+        return self._non_negative_int(self._max_bytes)
+
+    @property
+    def backup_count(self) -> int:
+        """
+        :return: Number of rotated log files kept
+        """
+        return self._non_negative_int(self._backup_count)
+
+    @staticmethod
+    def _non_negative_int(item: EnvironmentValue) -> int:
+        """
+        Parse a non-negative integer configuration item
+        :param item: configuration item
+        :return: item value
+        """
+        value = item.value
+        if value.isdigit():
+            return int(value)
+        raise RuntimeError(f'Invalid value specified in {item.key}: "{value}"')
+
+    @property
+    def trace_file(self) -> str:
+        """
+        :return: Operation trace (JSONL) file name, tracing is disabled if empty
+        """
+        return self._trace_file.value
+
     @property
     def formatting(self) -> str:
         """
@@ -0,0 +1,200 @@
+"""
+    Per-navigation page performance report
+"""
+import csv
+import json
+import math
+import re
+import threading
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable
+from urllib.parse import urlsplit
+
+# Reads Navigation Timing, paint and LCP entries of the current document. Buffered LCP entries are available through
+# takeRecords() right after observe(), so the script does not have to wait for the observer callback.
+COLLECT_SCRIPT = '''
+    const navigation = performance.getEntriesByType('navigation')[0] || {};
+    const paints = Object.fromEntries(performance.getEntriesByType('paint').map(entry => [entry.name, entry.startTime]));
+    const resources = performance.getEntriesByType('resource');
+    let lcp = null;
+    try {
+        const observer = new PerformanceObserver(() => {});
+        observer.observe({type: 'largest-contentful-paint', buffered: true});
+        const records = observer.takeRecords();
+        observer.disconnect();
+        if (records.length) lcp = records[records.length - 1].startTime;
+    } catch (e) {}
+    return {
+        ttfb_ms: navigation.responseStart ?? null,
+        dom_content_loaded_ms: navigation.domContentLoadedEventEnd ?? null,
+        load_ms: navigation.loadEventEnd ?? null,
+        first_paint_ms: paints['first-paint'] ?? null,
+        first_contentful_paint_ms: paints['first-contentful-paint'] ?? null,
+        largest_contentful_paint_ms: lcp,
+        transfer_bytes: (navigation.transferSize || 0) + resources.reduce((sum, entry) => sum + (entry.transferSize || 0), 0),
+        request_count: resources.length + 1,
+    };
+'''
+
+# Metrics aggregated per URL pattern
+METRICS = ('duration_ms', 'ttfb_ms', 'dom_content_loaded_ms', 'load_ms', 'first_contentful_paint_ms',
+           'largest_contentful_paint_ms', 'transfer_bytes', 'request_count', 'network_bytes', 'network_requests')
+
+_NUMERIC_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+@dataclass
+class NavigationEntry:
+    """
+    Performance of a single navigation; times are in milliseconds since navigation start, None if not available
+    """
+    url: str
+    timestamp: str
+    # wall time of Browser.get()
+    duration_ms: float
+    ttfb_ms: float | None = None
+    dom_content_loaded_ms: float | None = None
+    load_ms: float | None = None
+    first_paint_ms: float | None = None
+    first_contentful_paint_ms: float | None = None
+    largest_contentful_paint_ms: float | None = None
+    # from Resource Timing; cross-origin resources without Timing-Allow-Origin report 0
+    transfer_bytes: int | None = None
+    request_count: int | None = None
+    # from CDP Network events, available with BrowserOptions.performance_log only
+    network_bytes: int | None = None
+    network_requests: int | None = None
+    # '<exception class>: <message>' of a failed navigation, None if the page loaded
+    error: str | None = None
+
+
+def default_pattern(url: str) -> str:
+    """
+    Group URLs by host and path, with numeric path segments replaced by ':id'
+    :param url: URL
+    :return: URL pattern
+    """
+    parts = urlsplit(url)
+    return f'{parts.netloc}{_NUMERIC_SEGMENT.sub("/:id", parts.path) or "/"}'
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """
+    :param values: sorted values
+    :param fraction: percentile as a fraction, e.g. 0.95
+    :return: nearest-rank percentile
+    """
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class NetworkCounter:
+    """
+    Counts requests and encoded bytes from CDP Network events
+    """
+
+    def __init__(self) -> None:
+        """
+            Initialize counters.
+        """
+        self.requests = 0
+        self.bytes = 0
+
+    def reset(self) -> None:
+        """
+            Reset counters at navigation start.
+        """
+        self.requests = 0
+        self.bytes = 0
+
+    def handle_event(self, method: str, params: dict[str, Any]) -> None:
+        """
+        Update counters with a CDP event
+        :param method: event name
+        :param params: event parameters
+        """
+        if method == 'Network.requestWillBeSent':
+            self.requests += 1
+        elif method == 'Network.loadingFinished':
+            self.bytes += int(params.get('encodedDataLength', 0))
+
+
+class NavigationReport:
+    """
+    In-memory collection of navigation entries, exportable to JSON/CSV and aggregated per URL pattern
+    """
+
+    def __init__(self) -> None:
+        """
+            Create an empty report.
+        """
+        self.entries: list[NavigationEntry] = []
+        self._lock = threading.Lock()
+
+    def add(self, url: str, duration_ms: float, metrics: dict[str, Any],
+            network: NetworkCounter | None = None, error: BaseException | None = None) -> NavigationEntry:
+        """
+        Add a navigation
+        :param url: URL requested
+        :param duration_ms: wall time of the navigation
+        :param metrics: result of COLLECT_SCRIPT
+        :param network: CDP network counters of the navigation, if available
+        :param error: exception raised by a failed navigation
+        :return: entry added
+        """
+        known = {item.name for item in fields(NavigationEntry)}
+        entry = NavigationEntry(url, datetime.now().isoformat(timespec='milliseconds'), duration_ms,
+                                **{key: value for key, value in metrics.items() if key in known})
+        if network is not None:
+            entry.network_bytes = network.bytes
+            entry.network_requests = network.requests
+        if error is not None:
+            entry.error = f'{type(error).__name__}: {str(error).strip()}'
+        with self._lock:
+            self.entries.append(entry)
+        return entry
+
+    def aggregate(self, patterns: Iterable[str] | None = None) -> dict[str, dict[str, dict[str, float]]]:
+        """
+        Aggregate metrics per URL pattern
+        :param patterns: regular expressions matched against URLs; the first matching one groups a URL. Without
+            patterns, or for URLs matching none of them, default_pattern() is used.
+        :return: {pattern: {metric: {'count': n, 'p50': value, 'p95': value}}}
+        """
+        compiled = [re.compile(pattern) for pattern in patterns or []]
+        groups: dict[str, list[NavigationEntry]] = {}
+        for entry in self.entries:
+            key = next((item.pattern for item in compiled if item.search(entry.url)), None) \
+                  or default_pattern(entry.url)
+            groups.setdefault(key, []).append(entry)
+        result: dict[str, dict[str, dict[str, float]]] = {}
+        for key, entries in groups.items():
+            result[key] = {}
+            for metric in METRICS:
+                values = sorted(value for entry in entries if (value := getattr(entry, metric)) is not None)
+                if values:
+                    result[key][metric] = {'count': len(values), 'p50': _percentile(values, 0.5),
+                                           'p95': _percentile(values, 0.95)}
+        return result
+
+    def save_json(self, path: str | Path, patterns: Iterable[str] | None = None) -> None:
+        """
+        Save entries and their per-pattern aggregates as JSON
+        :param path: output file
+        :param patterns: URL patterns, see aggregate()
+        """
+        with open(path, 'w', encoding='utf-8') as json_file:
+            json.dump({'entries': [asdict(entry) for entry in self.entries],
+                       'aggregates': self.aggregate(patterns)}, json_file, indent=2)
+
+    def save_csv(self, path: str | Path) -> None:
+        """
+        Save entries as CSV
+        :param path: output file
+        """
+        with open(path, 'w', encoding='utf-8', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=[item.name for item in fields(NavigationEntry)])
+            writer.writeheader()
+            for entry in self.entries:
+                writer.writerow(asdict(entry))
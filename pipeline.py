@@ -0,0 +1,396 @@
+"""
+    Streaming batch processing of URL lists across a pool of browsers
+"""
+import concurrent.futures
+import json
+import os
+import queue
+import signal
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Callable, Generic, Iterable, Iterator, TypeVar
+
+from selenium.common.exceptions import WebDriverException
+
+from .log import setup_logging
+from .procstats import process_tree
+
+if TYPE_CHECKING:
+    from .browser import Browser
+
+log = setup_logging(__name__)
+
+T = TypeVar('T')
+
+# Interval at which blocked threads check whether the pipeline was stopped
+_STOP_CHECK_INTERVAL = 0.2
+
+
+class JobTimeoutError(TimeoutError):
+    """
+    Job still running when its timeout expired
+    """
+
+
+@dataclass
+class Job:
+    """
+    Single unit of work. The key identifies the job in a checkpoint file and defaults to the URL.
+    """
+    url: str
+    key: str = ''
+    payload: Any = None
+
+    def __post_init__(self) -> None:
+        """
+            Default the job key to its URL.
+        """
+        self.key = self.key or self.url
+
+
+@dataclass
+class JobResult(Generic[T]):
+    """
+    Outcome of a single job
+    """
+    job: Job
+    value: T | None = None
+    error: BaseException | None = None
+    attempts: int = 0
+    elapsed: float = 0.0
+
+    def __bool__(self) -> bool:
+        """
+            Return True if the job succeeded
+        """
+        return self.error is None
+
+
+@dataclass
+class PipelineStats:
+    """
+    Pipeline throughput statistics
+    """
+    completed: int = 0
+    failed: int = 0
+    retried: int = 0
+    skipped: int = 0
+    busy_time: float = 0.0
+    started: float = field(default_factory=monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        """
+        :return: time since the pipeline has started, in seconds
+        """
+        return monotonic() - self.started
+
+    @property
+    def throughput(self) -> float:
+        """
+        :return: finished jobs per second
+        """
+        elapsed = self.elapsed
+        return (self.completed + self.failed) / elapsed if elapsed else 0.0
+
+    def __str__(self) -> str:
+        """
+            Return a one-line summary.
+        """
+        return f'completed={self.completed} failed={self.failed} retried={self.retried} skipped={self.skipped} ' \
+               f'elapsed={self.elapsed:.1f}s throughput={self.throughput:.2f} jobs/s'
+
+
+class _Checkpoint:
+    """
+    Append-only JSONL file of finished job keys
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """
+            Load keys of jobs finished in previous runs.
+        """
+        self.path = Path(path)
+        self.done: set[str] = set()
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as checkpoint_file:
+                for line in checkpoint_file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # last line of an interrupted run may be truncated
+                        continue
+                    if entry.get('ok'):
+                        self.done.add(entry['key'])
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def record(self, result: JobResult[Any]) -> None:
+        """
+        Record a finished job
+        :param result: job result
+        """
+        self._file.write(json.dumps({'key': result.job.key, 'ok': bool(result), 'attempts': result.attempts,
+                                     'error': repr(result.error) if result.error else None}) + '\n')
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+            Close the checkpoint file.
+        """
+        self._file.close()
+
+
+class BatchPipeline(Generic[T]):
+    """
+    Runs jobs across a pool of browsers, one worker thread per browser, and yields results in completion order.
+
+    Both the job queue and the result queue are bounded, so jobs are pulled from the input iterable only as fast as
+    results are consumed. A job is written to the checkpoint file once the consumer asks for the next result, so
+    an interrupted run can be resumed by running the pipeline again with the same checkpoint file.
+
+    Browsers running in parallel need user data dirs of their own, e.g. clones of a profile template:
+
+    Usage:
+        template = ProfileTemplate(Path.home() / '.cache' / 'browser-template')
+        factory = lambda: Browser(BrowserOptions(root_path, True, False, '', profile_template=template))
+        pipeline = BatchPipeline(urls, worker, factory, browsers=4, checkpoint='run.jsonl')
+        for result in pipeline:
+            ...
+        print(pipeline.stats)
+    """
+
+    def __init__(self, jobs: Iterable[str | Job],
+                 worker: Callable[['Browser', Job], T],
+                 browser_factory: Callable[[], 'Browser'],
+                 browsers: int = 2,
+                 job_timeout: int | None = None,
+                 retries: int = 1,
+                 retry_budget: int | None = None,
+                 checkpoint: str | Path | None = None) -> None:
+        """
+        Class constructor
+        :param jobs: URLs or jobs to process
+        :param worker: callable processing a job with the browser provided, typically starting with browser.get()
+        :param browser_factory: callable creating a new browser
+        :param browsers: number of browsers working in parallel
+        :param job_timeout: per-job timeout in seconds; used as page load and script timeout, and a job still
+            running after that is abandoned and reported as failed, its browser processes killed and replaced. None
+            means the browser default timeout.
+        :param retries: number of retries of a failed job
+        :param retry_budget: maximum number of retries in the whole run, or None for no limit
+        :param checkpoint: checkpoint file path; jobs recorded there as finished are skipped
+        """
+        if browsers < 1:
+            raise ValueError(f'browsers must be positive, got {browsers}')
+        self.jobs = jobs
+        self.worker = worker
+        self.browser_factory = browser_factory
+        self.browsers = browsers
+        self.job_timeout = job_timeout
+        self.retries = retries
+        self.retry_budget = retry_budget
+        self.checkpoint = checkpoint
+        self.stats = PipelineStats()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def __iter__(self) -> Iterator[JobResult[T]]:
+        """
+        Run the pipeline
+        :return: iterator over job results in completion order
+        """
+        checkpoint = _Checkpoint(self.checkpoint) if self.checkpoint else None
+        self.stats = PipelineStats()
+        self._stop.clear()
+        jobs: queue.Queue[Job | None] = queue.Queue(maxsize=self.browsers * 2)
+        results: queue.Queue[JobResult[T] | None] = queue.Queue(maxsize=self.browsers * 2)
+        threads = [threading.Thread(target=self._feed, args=(jobs, checkpoint), name='pipeline feeder', daemon=True)]
+        threads += [threading.Thread(target=self._work, args=(jobs, results), name=f'pipeline worker {index}',
+                                     daemon=True) for index in range(self.browsers)]
+        for thread in threads:
+            thread.start()
+        running = self.browsers
+        try:
+            while running:
+                result = results.get()
+                if result is None:
+                    running -= 1
+                    continue
+                yield result
+                if checkpoint:
+                    checkpoint.record(result)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            if checkpoint:
+                checkpoint.close()
+            log.debug(f'Pipeline finished: {self.stats}')
+
+    def _put(self, target: 'queue.Queue[Any]', item: Any) -> bool:
+        """
+        Put an item into a bounded queue unless the pipeline is stopped
+        :param target: queue
+        :param item: item to put
+        :return: False if the pipeline was stopped
+        """
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=_STOP_CHECK_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _feed(self, jobs: 'queue.Queue[Job | None]', checkpoint: _Checkpoint | None) -> None:
+        """
+        Feed jobs into the job queue, followed by one end marker per worker
+        :param jobs: job queue
+        :param checkpoint: checkpoint of a previous run
+        """
+        try:
+            for item in self.jobs:
+                job = item if isinstance(item, Job) else Job(item)
+                if checkpoint and job.key in checkpoint.done:
+                    with self._lock:
+                        self.stats.skipped += 1
+                    continue
+                if not self._put(jobs, job):
+                    return
+        finally:
+            for _ in range(self.browsers):
+                self._put(jobs, None)
+
+    def _work(self, jobs: 'queue.Queue[Job | None]', results: 'queue.Queue[JobResult[T] | None]') -> None:
+        """
+        Worker thread: process jobs with its own browser until the end marker is received
+        :param jobs: job queue
+        :param results: result queue
+        """
+        browser: 'Browser | None' = None
+        try:
+            while not self._stop.is_set():
+                try:
+                    job = jobs.get(timeout=_STOP_CHECK_INTERVAL)
+                except queue.Empty:
+                    continue
+                if job is None:
+                    break
+                result: JobResult[T] = JobResult(job)
+                while True:
+                    result.attempts += 1
+                    started = monotonic()
+                    try:
+                        if browser is None:
+                            browser = self._create_browser()
+                        result.value = self._run_job(browser, job)
+                        result.error = None
+                    except Exception as e:
+                        result.value, result.error = None, e
+                        log.debug(f'Job "{job.key}" failed (attempt {result.attempts}): {e}')
+                        if isinstance(e, JobTimeoutError):
+                            # already abandoned by _run_job()
+                            browser = None
+                        elif isinstance(e, WebDriverException) and browser is not None:
+                            # the browser may be unusable now, start over with a new one
+                            self._quit(browser)
+                            browser = None
+                    finally:
+                        result.elapsed += monotonic() - started
+                    if result.error is None or not self._take_retry(result):
+                        break
+                with self._lock:
+                    self.stats.busy_time += result.elapsed
+                    if result.error is None:
+                        self.stats.completed += 1
+                    else:
+                        self.stats.failed += 1
+                if not self._put(results, result):
+                    break
+        finally:
+            if browser is not None:
+                self._quit(browser)
+            self._put(results, None)
+
+    def _run_job(self, browser: 'Browser', job: Job) -> T:
+        """
+        Run the worker on a job, in a thread of its own if the job has a timeout. A job still running when the
+        timeout expires is abandoned: its browser processes are killed, so that the worker fails on its next
+        WebDriver call, and its result is never used.
+        :param browser: browser
+        :param job: job
+        :return: worker result
+        :raises JobTimeoutError if the job did not finish in time
+        """
+        if not self.job_timeout:
+            return self.worker(browser, job)
+        future: concurrent.futures.Future[T] = concurrent.futures.Future()
+
+        def _run() -> None:
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(self.worker(browser, job))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=_run, name=f'pipeline job {job.key}', daemon=True).start()
+        try:
+            return future.result(timeout=self.job_timeout)
+        except concurrent.futures.TimeoutError:
+            log.warning(f'Job "{job.key}" exceeded its timeout of {self.job_timeout}(s), killing its browser')
+            self._kill(browser)
+            # quit() releases the browser's resources (disk cache slot, daemon browser context) once the hung
+            # command fails, without blocking this worker
+            threading.Thread(target=self._quit, args=(browser,), name='pipeline quit', daemon=True).start()
+            raise JobTimeoutError(f'Job "{job.key}" exceeded its timeout of {self.job_timeout}(s)') from None
+
+    @staticmethod
+    def _kill(browser: 'Browser') -> None:
+        """
+        Kill the processes of a browser with a hung command; quit() would wait for that command to finish
+        :param browser: browser
+        """
+        service = browser.service
+        for pid in process_tree(service.process.pid) if service is not None and service.process is not None else []:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def _create_browser(self) -> 'Browser':
+        """
+        Create a browser and apply the per-job timeout
+        :return: new browser
+        """
+        browser = self.browser_factory()
+        if self.job_timeout:
+            browser.set_page_load_timeout(self.job_timeout)
+            browser.set_script_timeout(self.job_timeout)
+        return browser
+
+    @staticmethod
+    def _quit(browser: 'Browser') -> None:
+        """
+        Quit a browser ignoring any errors
+        :param browser: browser to quit
+        """
+        try:
+            browser.quit()
+        except Exception as e:
+            log.debug(f'Error closing browser: {e}')
+
+    def _take_retry(self, result: JobResult[T]) -> bool:
+        """
+        Check if a failed job may be retried and charge the retry budget
+        :param result: failed job result
+        :return: True if the job should be retried
+        """
+        if result.attempts > self.retries:
+            return False
+        with self._lock:
+            if self.retry_budget is not None and self.stats.retried >= self.retry_budget:
+                return False
+            self.stats.retried += 1
+        return True
@@ -0,0 +1,74 @@
+"""
+    Process tree resource usage read from /proc (Linux only)
+"""
+import os
+from pathlib import Path
+
+PROC = Path('/proc')
+
+
+def _read_stat(pid: int) -> list[str] | None:
+    """
+    Read /proc/<pid>/stat fields following the process name
+    :param pid: process id
+    :return: fields starting with the process state, or None if the process does not exist
+    """
+    try:
+        stat = PROC.joinpath(str(pid), 'stat').read_text()
+    except OSError:
+        return None
+    # process name may contain spaces and parentheses, so split after its last closing parenthesis
+    return stat[stat.rindex(')') + 2:].split()
+
+
+def process_tree(pid: int) -> list[int]:
+    """
+    List a process and all its descendants
+    :param pid: root process id
+    :return: process ids, empty if /proc is not available
+    """
+    if not PROC.is_dir():
+        return []
+    children: dict[int, list[int]] = {}
+    for entry in PROC.iterdir():
+        if not entry.name.isdigit():
+            continue
+        fields = _read_stat(int(entry.name))
+        if fields is not None:
+            children.setdefault(int(fields[1]), []).append(int(entry.name))
+    tree = [pid]
+    for item in tree:
+        tree += children.get(item, [])
+    return tree
+
+
+def rss_bytes(pids: list[int]) -> int:
+    """
+    Sum resident set size of processes
+    :param pids: process ids
+    :return: RSS in bytes; shared pages are counted in every process
+    """
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    for pid in pids:
+        try:
+            total += int(PROC.joinpath(str(pid), 'statm').read_text().split()[1]) * page_size
+        except OSError:
+            pass
+    return total
+
+
+def cpu_seconds(pids: list[int]) -> float:
+    """
+    Sum user and system CPU time of processes
+    :param pids: process ids
+    :return: CPU time in seconds
+    """
+    ticks = os.sysconf('SC_CLK_TCK')
+    total = 0
+    for pid in pids:
+        fields = _read_stat(pid)
+        if fields is not None:
+            # utime and stime are fields 14 and 15 of /proc/<pid>/stat, i.e. 11 and 12 after the process state
+            total += int(fields[11]) + int(fields[12])
+    return total / ticks
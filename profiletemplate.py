@@ -0,0 +1,311 @@
+"""
+    Chrome profile templates: build a primed user data dir once, then clone it per browser instance
+"""
+import atexit
+import errno
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import uuid
+from enum import StrEnum
+from pathlib import Path
+from time import sleep
+from typing import Any
+
+from .log import setup_logging
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+log = setup_logging(__name__)
+
+TRASH_PREFIX = '.trash-'
+READY_MARKER = '.template-ready'
+# Linux FICLONE ioctl request number, clones the file sharing its extents (copy-on-write)
+_FICLONE = 0x40049409
+
+DEFAULT_PREFERENCES: dict[str, Any] = {
+    'browser': {'has_seen_welcome_page': True, 'check_default_browser': False},
+    'distribution': {'skip_first_run_ui': True, 'suppress_first_run_default_browser_prompt': True,
+                     'suppress_first_run_bubble': True, 'import_bookmarks': False, 'import_history': False},
+    'credentials_enable_service': False,
+    'profile': {'password_manager_enabled': False, 'exit_type': 'Normal', 'exited_cleanly': True},
+    'translate': {'enabled': False},
+}
+
+_cleanup_threads: list[threading.Thread] = []
+# set once the interpreter starts exiting, after which deletions run synchronously
+_exiting = False
+
+
+def _delete_in_background(path: Path) -> None:
+    """
+    Delete a directory tree in a daemon thread; pending deletions are waited for at interpreter exit
+    :param path: directory to delete
+    """
+    if _exiting:
+        shutil.rmtree(path, ignore_errors=True)
+        return
+    thread = threading.Thread(target=shutil.rmtree, args=(path,), kwargs={'ignore_errors': True}, daemon=True,
+                              name=f'rmtree {path.name}')
+    _cleanup_threads[:] = [item for item in _cleanup_threads if item.is_alive()]
+    _cleanup_threads.append(thread)
+    try:
+        thread.start()
+    except RuntimeError:
+        # threads cannot be started during interpreter shutdown
+        _cleanup_threads.remove(thread)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@atexit.register
+def _finish_cleanup() -> None:
+    """
+        Wait for pending deletions, as daemon threads are killed at interpreter exit.
+    """
+    global _exiting
+    _exiting = True
+    wait_for_cleanup()
+
+
+def discard_profile(path: Path | None) -> None:
+    """
+    Remove a user data dir without blocking the caller. The directory is renamed first, so its original path is free
+    for reuse immediately, and the actual deletion runs in a background thread.
+    :param path: user data dir to remove
+    """
+    if path is None or not path.exists():
+        return
+    trash = path.with_name(f'{TRASH_PREFIX}{path.name}-{uuid.uuid4().hex[:8]}')
+    try:
+        path.rename(trash)
+    except OSError as e:
+        log.debug(f'Cannot move "{path}" away ({e}), deleting in place')
+        trash = path
+    _delete_in_background(trash)
+
+
+def sweep_trash(root: Path) -> None:
+    """
+    Delete leftovers of discard_profile() calls interrupted by interpreter exit
+    :param root: directory to sweep
+    """
+    if not root.is_dir():
+        return
+    for item in root.iterdir():
+        if item.name.startswith(TRASH_PREFIX) and item.is_dir():
+            _delete_in_background(item)
+
+
+def wait_for_cleanup(timeout: float | None = None) -> None:
+    """
+    Wait until pending background profile deletions finish
+    :param timeout: maximum time to wait for every deletion, or None to wait indefinitely
+    """
+    for thread in list(_cleanup_threads):
+        thread.join(timeout)
+
+
+def _reflink(source: Path, target: Path) -> bool:
+    """
+    Clone a file with the FICLONE ioctl (btrfs, XFS, bcachefs, ...)
+    :param source: source file
+    :param target: target file
+    :return: True if the file was cloned, False if the filesystem does not support it
+    """
+    if fcntl is None:
+        return False
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError as e:
+            if e.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+                return False
+            raise
+    shutil.copystat(source, target)
+    return True
+
+
+class ProfileTemplate:
+    """
+    Primed Chrome user data dir used as a source of per-instance profiles.
+
+    The template is built once (first-run sentinel, preferences and, optionally, caches warmed up by visiting
+    a list of URLs) and every browser instance gets its own clone, so instances can run in parallel without
+    sharing a profile, and Chrome does not have to initialize a cold profile on each launch.
+    """
+
+    class CloneMethod(StrEnum):
+        """
+        How template files are materialized in a clone
+        """
+        AUTO = 'auto'
+        REFLINK = 'reflink'
+        COPY = 'copy'
+
+    def __init__(self, template_dir: str | Path | None = None,
+                 preferences: dict[str, Any] | None = None,
+                 warmup_urls: list[str] | None = None,
+                 warmup_seconds: float = 5.0,
+                 clone_root: str | Path | None = None,
+                 use_tmpfs: bool = False,
+                 clone_method: CloneMethod = CloneMethod.AUTO) -> None:
+        """
+        Class constructor
+        :param template_dir: template location (default: "<tempdir>/profile-template")
+        :param preferences: Chrome preferences to merge over DEFAULT_PREFERENCES
+        :param warmup_urls: pages to visit while building the template to warm up its caches
+        :param warmup_seconds: time to let Chrome load the warm-up pages
+        :param clone_root: directory where clones are created (default: system temp dir)
+        :param use_tmpfs: create clones in /dev/shm if available; ignored if clone_root is set
+        :param clone_method: how files are copied into a clone
+        """
+        self.template_dir = Path(template_dir or Path(tempfile.gettempdir(), 'profile-template'))
+        self.preferences = _merge(DEFAULT_PREFERENCES, preferences or {})
+        self.warmup_urls = warmup_urls or []
+        self.warmup_seconds = warmup_seconds
+        self.clone_method = clone_method
+        if clone_root:
+            self.clone_root = Path(clone_root)
+        elif use_tmpfs and os.access('/dev/shm', os.W_OK):
+            self.clone_root = Path('/dev/shm')
+        else:
+            self.clone_root = Path(tempfile.gettempdir())
+
+    def __repr__(self) -> str:
+        """
+            Return string representation of the object.
+        """
+        return f'ProfileTemplate(template_dir={self.template_dir}, clone_root={self.clone_root}, ' \
+               f'clone_method={self.clone_method})'
+
+    @property
+    def ready(self) -> bool:
+        """
+        :return: True if the template was already built
+        """
+        return self.template_dir.joinpath(READY_MARKER).exists()
+
+    def build(self, chrome_location: str = '', arguments: list[str] | None = None, rebuild: bool = False) -> Path:
+        """
+        Build the template unless it already exists. The template is assembled in a temporary directory and renamed
+        into place, so concurrent builders never see a half-built template.
+        :param chrome_location: Chrome binary used for cache warm-up; warm-up is skipped if empty
+        :param arguments: additional Chrome arguments for the warm-up run
+        :param rebuild: discard an existing template and build it again
+        :return: template directory
+        """
+        if self.ready and not rebuild:
+            return self.template_dir
+        self.template_dir.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix='.build-', dir=self.template_dir.parent))
+        log.debug(f'Building profile template in "{staging}"')
+        # Chrome skips its first-run experience if this sentinel file exists
+        staging.joinpath('First Run').touch()
+        default_profile = staging.joinpath('Default')
+        default_profile.mkdir()
+        with open(default_profile.joinpath('Preferences'), 'w', encoding='utf-8') as preferences_file:
+            json.dump(self.preferences, preferences_file)
+        if chrome_location and self.warmup_urls:
+            self._warm_up(staging, chrome_location, arguments or [])
+        staging.joinpath(READY_MARKER).touch()
+
+        if rebuild:
+            discard_profile(self.template_dir)
+        try:
+            staging.rename(self.template_dir)
+        except OSError:
+            # Another process has built the template in the meantime
+            log.debug(f'Profile template "{self.template_dir}" already exists, discarding "{staging}"')
+            _delete_in_background(staging)
+        return self.template_dir
+
+    def _warm_up(self, profile_dir: Path, chrome_location: str, arguments: list[str]) -> None:
+        """
+        Let Chrome visit warm-up pages using the profile being built
+        :param profile_dir: profile directory
+        :param chrome_location: Chrome binary
+        :param arguments: additional Chrome arguments
+        """
+        command = [chrome_location, f'--user-data-dir={profile_dir}', '--headless', '--no-first-run',
+                   '--no-default-browser-check', *(f'--{arg}' for arg in arguments), *self.warmup_urls]
+        log.debug(f'Warming up profile template: {command}')
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            sleep(self.warmup_seconds)
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        # Lock files are tied to the warm-up process and must not end up in clones
+        for name in ('SingletonLock', 'SingletonCookie', 'SingletonSocket'):
+            lock = profile_dir.joinpath(name)
+            if lock.is_symlink() or lock.exists():
+                lock.unlink()
+
+    def clone(self, chrome_location: str = '', arguments: list[str] | None = None) -> Path:
+        """
+        Create a new user data dir from the template, building the template first if needed
+        :param chrome_location: Chrome binary used if the template has to be built
+        :param arguments: additional Chrome arguments used if the template has to be built
+        :return: new user data dir; release it with discard_profile()
+        """
+        self.build(chrome_location, arguments)
+        self.clone_root.mkdir(parents=True, exist_ok=True)
+        sweep_trash(self.clone_root)
+        target = Path(tempfile.mkdtemp(prefix='profile-', dir=self.clone_root))
+        method = self.clone_method
+        for source_dir, dirs, files in os.walk(self.template_dir):
+            relative = Path(source_dir).relative_to(self.template_dir)
+            target_dir = target.joinpath(relative)
+            for name in dirs:
+                target_dir.joinpath(name).mkdir()
+            for name in files:
+                if name == READY_MARKER:
+                    continue
+                method = self._clone_file(Path(source_dir, name), target_dir.joinpath(name), method)
+        log.debug(f'Cloned profile template into "{target}" using {method}')
+        return target
+
+    @classmethod
+    def _clone_file(cls, source: Path, target: Path, method: CloneMethod) -> CloneMethod:
+        """
+        Materialize a single template file in the clone. Files are never hardlinked: Chrome writes cache files in
+        place, so a shared inode would let one instance change the template and every other clone.
+        :param source: template file
+        :param target: clone file
+        :param method: requested method
+        :return: method to use for the following files (AUTO degrades once reflinks turn out to be unsupported)
+        """
+        if method in (cls.CloneMethod.AUTO, cls.CloneMethod.REFLINK):
+            if _reflink(source, target):
+                return method
+            if method == cls.CloneMethod.REFLINK:
+                raise RuntimeError(f'Filesystem of "{target}" does not support reflinks')
+            method = cls.CloneMethod.COPY
+        shutil.copy2(source, target)
+        return method
+
+
+def _merge(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
+    """
+    Recursively merge two dictionaries
+    :param base: base values
+    :param override: values taking precedence
+    :return: merged dictionary
+    """
+    result = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = _merge(result[key], value)
+        else:
+            result[key] = value
+    return result
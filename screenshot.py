@@ -0,0 +1,70 @@
+"""
+    Screenshot settings and helpers for CDP based screenshot capture
+"""
+import base64
+from dataclasses import dataclass
+from enum import StrEnum
+from pathlib import Path
+
+# Number of base64 characters decoded at once; a multiple of 4, so every chunk decodes on its own
+_DECODE_CHUNK = 4 * 256 * 1024
+
+
+class ScreenshotFormat(StrEnum):
+    """
+    Image format supported by CDP 'Page.captureScreenshot'
+    """
+    PNG = 'png'
+    JPEG = 'jpeg'
+    WEBP = 'webp'
+
+
+@dataclass
+class ScreenshotSettings:
+    """
+    Screenshot capture settings
+
+    PNG is lossless but by far the most expensive format for Chrome to encode; JPEG or WebP with a moderate quality
+    setting is usually good enough for trace and error screenshots and an order of magnitude smaller.
+    """
+    format: ScreenshotFormat = ScreenshotFormat.PNG
+    # compression quality in range 0-100, JPEG and WebP only
+    quality: int | None = None
+    # scale applied to the captured area, e.g. 0.5 halves both dimensions
+    scale: float = 1.0
+    # capture the whole page instead of the visible viewport
+    full_page: bool = False
+    # let Chrome trade compression ratio for encoding speed
+    optimize_for_speed: bool = False
+
+    @property
+    def extension(self) -> str:
+        """
+        :return: file extension matching the format
+        """
+        return 'jpg' if self.format == ScreenshotFormat.JPEG else str(self.format)
+
+    def cdp_parameters(self) -> dict[str, object]:
+        """
+        :return: 'Page.captureScreenshot' parameters, except for the clip rectangle
+        """
+        parameters: dict[str, object] = {'format': str(self.format)}
+        if self.quality is not None and self.format != ScreenshotFormat.PNG:
+            parameters['quality'] = self.quality
+        if self.optimize_for_speed:
+            parameters['optimizeForSpeed'] = True
+        return parameters
+
+
+def write_base64(data: str, path: str | Path) -> int:
+    """
+    Decode base64 data into a file chunk by chunk, without building a decoded copy of the whole image in memory
+    :param data: base64 encoded data
+    :param path: output file
+    :return: number of bytes written
+    """
+    written = 0
+    with open(path, 'wb') as output:
+        for start in range(0, len(data), _DECODE_CHUNK):
+            written += output.write(base64.b64decode(data[start:start + _DECODE_CHUNK]))
+    return written
@@ -0,0 +1,282 @@
+"""
+    Browser session state (cookies and web storage) snapshots, encrypted at rest
+"""
+import base64
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from time import monotonic, sleep, time
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+from urllib.parse import urlsplit
+
+from .log import setup_logging
+
+if TYPE_CHECKING:
+    from .browser import Browser
+
+log = setup_logging(__name__)
+
+# Environment variable holding the passphrase used when none is passed explicitly
+PASSPHRASE_ENVIRONMENT_VARIABLE = 'BROWSER_SESSION_KEY'
+_FILE_VERSION = 1
+_KDF_ITERATIONS = 390_000
+
+# Restores saved storage items of the page origin when a document is created, before any page script runs.
+# Only keys missing in the storage are set, so the page's own changes are not overwritten on later navigations.
+_RESTORE_STORAGE_SCRIPT = '''
+(() => {
+    const saved = %s[location.origin];
+    if (!saved) return;
+    for (const [area, items] of [[localStorage, saved.local], [sessionStorage, saved.session]]) {
+        for (const [key, value] of Object.entries(items || {})) {
+            if (area.getItem(key) === null) area.setItem(key, value);
+        }
+    }
+})();
+'''
+
+
+@dataclass
+class SessionExpiry:
+    """
+    Cookie expiry summary of a session state
+    """
+    total: int = 0
+    session_cookies: int = 0
+    expired: list[str] = field(default_factory=list)
+    earliest_expiry: datetime | None = None
+
+    def __str__(self) -> str:
+        """
+            Return a one-line summary.
+        """
+        earliest = self.earliest_expiry.isoformat(timespec='seconds') if self.earliest_expiry else '-'
+        return f'{self.total} cookies, {self.session_cookies} session-only, {len(self.expired)} expired, ' \
+               f'earliest expiry: {earliest}'
+
+
+@dataclass
+class SessionState:
+    """
+    Cookies of all domains and localStorage/sessionStorage items per origin
+    """
+    cookies: list[dict[str, Any]] = field(default_factory=list)
+    # {origin: {'local': {key: value}, 'session': {key: value}}}
+    storage: dict[str, dict[str, dict[str, str]]] = field(default_factory=dict)
+    saved_at: float = field(default_factory=time)
+
+    def expiry(self, now: float | None = None) -> SessionExpiry:
+        """
+        Summarize cookie expiry
+        :param now: reference time as a Unix timestamp (default: current time)
+        :return: expiry summary
+        """
+        now = now or time()
+        report = SessionExpiry(total=len(self.cookies))
+        for cookie in self.cookies:
+            expires = cookie.get('expires', -1)
+            if cookie.get('session') or expires < 0:
+                report.session_cookies += 1
+            elif expires <= now:
+                report.expired.append(f'{cookie["name"]}@{cookie["domain"]}')
+            else:
+                expiry = datetime.fromtimestamp(expires, timezone.utc)
+                if report.earliest_expiry is None or expiry < report.earliest_expiry:
+                    report.earliest_expiry = expiry
+        return report
+
+    def save(self, path: str | Path, passphrase: str | None = None) -> None:
+        """
+        Encrypt and save the state
+        :param path: output file
+        :param passphrase: encryption passphrase (default: value of BROWSER_SESSION_KEY environment variable)
+        """
+        from cryptography.fernet import Fernet  # optional dependency, needed for session files only
+
+        salt = os.urandom(16)
+        payload = json.dumps({'cookies': self.cookies, 'storage': self.storage, 'saved_at': self.saved_at})
+        token = Fernet(_derive_key(passphrase, salt)).encrypt(payload.encode('utf-8'))
+        path = Path(path)
+        temporary = path.with_name(f'{path.name}.tmp')
+        # the file is only readable by its owner, and replaced atomically so a reader never sees a partial one
+        with open(os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as file:
+            json.dump({'version': _FILE_VERSION, 'salt': base64.b64encode(salt).decode('ascii'),
+                       'token': token.decode('ascii')}, file)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str | Path, passphrase: str | None = None) -> 'SessionState':
+        """
+        Load and decrypt a state
+        :param path: input file
+        :param passphrase: encryption passphrase (default: value of BROWSER_SESSION_KEY environment variable)
+        :return: session state
+        :raises RuntimeError if the file cannot be decrypted
+        """
+        from cryptography.fernet import Fernet, InvalidToken
+
+        with open(path, encoding='utf-8') as file:
+            envelope = json.load(file)
+        if envelope.get('version') != _FILE_VERSION:
+            raise RuntimeError(f'Unsupported session file version in "{path}": {envelope.get("version")}')
+        try:
+            payload = Fernet(_derive_key(passphrase, base64.b64decode(envelope['salt']))).decrypt(envelope['token'])
+        except InvalidToken:
+            raise RuntimeError(f'Cannot decrypt session file "{path}": wrong passphrase or corrupted file') from None
+        return cls(**json.loads(payload))
+
+
+def _derive_key(passphrase: str | None, salt: bytes) -> bytes:
+    """
+    Derive a Fernet key from a passphrase
+    :param passphrase: passphrase or None to read it from the environment
+    :param salt: key derivation salt
+    :return: urlsafe base64 encoded key
+    """
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+    passphrase = passphrase or os.environ.get(PASSPHRASE_ENVIRONMENT_VARIABLE)
+    if not passphrase:
+        raise RuntimeError(f'Session file passphrase not provided, set {PASSPHRASE_ENVIRONMENT_VARIABLE}')
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=_KDF_ITERATIONS)
+    return base64.urlsafe_b64encode(kdf.derive(passphrase.encode('utf-8')))
+
+
+def _origin(url: str) -> str:
+    """
+    :param url: URL or origin
+    :return: origin of the URL, e.g. 'https://example.com'
+    """
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+def _read_storage(execute: Callable[[str, dict[str, Any]], dict[str, Any]],
+                  origin: str) -> dict[str, dict[str, str]] | None:
+    """
+    Read localStorage and sessionStorage items of an origin
+    :param execute: CDP command executor of a page with the DOMStorage domain enabled
+    :param origin: origin
+    :return: {'local': {key: value}, 'session': {key: value}} without empty areas, or None if the storage cannot be
+        read, e.g. because no frame of the page has this origin
+    """
+    storage: dict[str, dict[str, str]] = {}
+    for area, is_local in (('local', True), ('session', False)):
+        try:
+            items = execute('DOMStorage.getDOMStorageItems', {
+                'storageId': {'securityOrigin': origin, 'isLocalStorage': is_local}})['entries']
+        except Exception as e:
+            log.debug(f'Cannot read {area} storage of {origin}: {e}')
+            return None
+        if items:
+            storage[area] = dict(items)
+    return storage
+
+
+def _read_in_new_tab(browser: 'Browser', origins: list[str]) -> dict[str, dict[str, dict[str, str]] | None]:
+    """
+    Read web storage of origins by opening each of them in a temporary tab, driven over the browser's CDP
+    connection so that neither the current tab nor the browser's navigation state is touched
+    :param browser: browser
+    :param origins: origins
+    :return: storage by origin, see _read_storage()
+    """
+    connection = browser.cdp_connection
+    parameters = {'url': 'about:blank'}
+    if browser.browser_context_id:
+        parameters['browserContextId'] = browser.browser_context_id
+    target = connection.execute('Target.createTarget', parameters)['targetId']
+    result: dict[str, dict[str, dict[str, str]] | None] = {}
+    try:
+        session_id = connection.execute('Target.attachToTarget', {'targetId': target, 'flatten': True})['sessionId']
+
+        def execute(method: str, params: dict[str, Any]) -> dict[str, Any]:
+            return connection.execute(method, params, session_id)
+
+        execute('DOMStorage.enable', {})
+        for origin in origins:
+            result[origin] = None
+            try:
+                response = execute('Page.navigate', {'url': f'{origin}/'})
+            except Exception as e:
+                log.debug(f'Cannot open {origin}: {e}')
+                continue
+            if response.get('errorText'):
+                log.debug(f'Cannot open {origin}: {response["errorText"]}')
+                continue
+            # the storage is reachable once the new document of the origin has been committed
+            deadline = monotonic() + browser.default_timeout
+            while monotonic() < deadline:
+                try:
+                    if execute('Runtime.evaluate', {'expression': 'location.origin', 'returnByValue': True}
+                               )['result'].get('value') == origin:
+                        break
+                except Exception as e:
+                    log.debug(f'Cannot read origin of the page loading {origin}: {e}')
+                sleep(0.1)
+            result[origin] = _read_storage(execute, origin)
+    finally:
+        try:
+            connection.execute('Target.closeTarget', {'targetId': target})
+        except Exception as e:
+            log.debug(f'Cannot close tab {target}: {e}')
+    return result
+
+
+def export_session(browser: 'Browser', origins: Iterable[str] = ()) -> SessionState:
+    """
+    Capture the session state of a browser. DOMStorage only reaches origins with a frame in the current page; the
+    other origins are opened in a temporary tab, which sees their localStorage but not the sessionStorage of the
+    current tab (sessionStorage belongs to a tab).
+    :param browser: browser
+    :param origins: origins (or URLs) whose web storage is saved, in addition to the current page's origin
+    :return: session state; origins whose storage cannot be read are logged as a warning and left out
+    """
+    state = SessionState(cookies=browser.get_all_cookies())
+    wanted = [_origin(url) for url in origins]
+    current_url = browser.current_url
+    if current_url.startswith('http'):
+        wanted.insert(0, _origin(current_url))
+    found: dict[str, dict[str, dict[str, str]] | None] = {}
+    browser.execute_cdp_cmd('DOMStorage.enable', {})
+    try:
+        for origin in dict.fromkeys(wanted):
+            found[origin] = _read_storage(browser.execute_cdp_cmd, origin)
+    finally:
+        browser.execute_cdp_cmd('DOMStorage.disable', {})
+    missing = [origin for origin, storage in found.items() if storage is None]
+    if missing:
+        found.update(_read_in_new_tab(browser, missing))
+    unreadable = []
+    for origin, storage in found.items():
+        if storage is None:
+            unreadable.append(origin)
+        elif storage:
+            state.storage[origin] = storage
+    if unreadable:
+        log.warning(f'Cannot read web storage of {", ".join(unreadable)}, it is not saved')
+    log.debug(f'Exported session: {state.expiry()}, storage of {len(state.storage)} origins')
+    return state
+
+
+def import_session(browser: 'Browser', state: SessionState) -> SessionExpiry:
+    """
+    Restore a session state; call it before the first get() so the first request already carries the cookies
+    :param browser: browser
+    :param state: session state
+    :return: expiry summary of the restored cookies; expired cookies are skipped
+    """
+    report = state.expiry()
+    now = time()
+    browser.set_all_cookies([cookie for cookie in state.cookies
+                             if cookie.get('session') or not 0 <= cookie.get('expires', -1) <= now])
+    if state.storage:
+        browser.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument',
+                                {'source': _RESTORE_STORAGE_SCRIPT % json.dumps(state.storage)})
+    if report.expired:
+        log.warning(f'Session contains expired cookies: {", ".join(report.expired)}')
+    log.debug(f'Imported session: {report}')
+    return report
@@ -0,0 +1,234 @@
+"""
+    Overlap page loads of many URLs in a single Chrome using a pool of tabs
+"""
+from dataclasses import dataclass
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Any, Callable, Generic, Iterable, Iterator, TypeVar
+
+from selenium.common.exceptions import TimeoutException
+
+from .log import setup_logging
+
+if TYPE_CHECKING:
+    from .browser import Browser
+
+log = setup_logging(__name__)
+
+T = TypeVar('T')
+
+# Set in the document being replaced, so its 'complete' ready state is not mistaken for the new page being loaded
+_STALE_MARKER = '__tabSchedulerStale'
+
+
+@dataclass
+class TabResult(Generic[T]):
+    """
+    Outcome of a single URL processed by TabScheduler
+    """
+    url: str
+    value: T | None = None
+    error: BaseException | None = None
+    elapsed: float = 0.0
+
+    def __bool__(self) -> bool:
+        """
+            Return True if the URL was processed successfully
+        """
+        return self.error is None
+
+
+@dataclass
+class _Navigation:
+    """
+    Navigation in progress in a tab
+    """
+    url: str
+    started: float
+
+
+class TabScheduler:
+    """
+    Keeps up to max_tabs tabs in one browser, starts navigations with CDP 'Page.navigate' (which returns as soon as
+    the navigation starts) and hands every tab that finished loading over to a worker callback. The tab is then
+    reused for the next URL. The scheduler opens tabs of its own and closes them when done; the caller's current
+    tab, and the page loaded in it, are left alone.
+
+    Tabs are opened, navigated and polled over the browser's own CDP connection (Browser.cdp_connection) rather
+    than through chromedriver, which would hold a command sent to a tab until that tab's pending navigation
+    finishes and so load the tabs one at a time. Only the worker call switches the WebDriver session to the tab.
+    """
+
+    def __init__(self, browser: 'Browser', max_tabs: int = 4, timeout: int | None = None,
+                 poll_interval: float = 0.1) -> None:
+        """
+        Class constructor
+        :param browser: browser to open tabs in
+        :param max_tabs: maximum number of tabs loading or being processed at the same time
+        :param timeout: page load timeout or None if the browser default timeout should be used
+        :param poll_interval: delay between checks of tabs ready state
+        """
+        if max_tabs < 1:
+            raise ValueError(f'max_tabs must be positive, got {max_tabs}')
+        self.browser = browser
+        self.max_tabs = max_tabs
+        self.timeout = timeout or browser.default_timeout
+        self.poll_interval = poll_interval
+        # CDP session id by window handle (target id)
+        self._sessions: dict[str, str] = {}
+
+    def run(self, urls: Iterable[str], worker: Callable[['Browser', str], T]) -> Iterator[TabResult[T]]:
+        """
+        Load URLs in tabs and call the worker for each loaded page. The browser is switched to the page's tab when
+        the worker is called. Results are yielded in completion order; worker exceptions and load timeouts are
+        reported in TabResult.error instead of being raised.
+        :param urls: URLs to process
+        :param worker: callable receiving the browser and the URL, its result is returned in TabResult.value
+        :return: iterator over results
+        """
+        browser = self.browser
+        connection = browser.cdp_connection
+        original_tab = browser.current_window_handle
+        opened_tabs: list[str] = []
+        idle_tabs: list[str] = []
+        active: dict[str, _Navigation] = {}
+        pending = iter(urls)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and (idle_tabs or len(opened_tabs) < self.max_tabs):
+                    url = next(pending, None)
+                    if url is None:
+                        exhausted = True
+                        break
+                    if idle_tabs:
+                        tab = idle_tabs.pop()
+                    else:
+                        parameters = {'url': 'about:blank'}
+                        if browser.browser_context_id:
+                            parameters['browserContextId'] = browser.browser_context_id
+                        tab = connection.execute('Target.createTarget', parameters)['targetId']
+                        opened_tabs.append(tab)
+                    error = self._navigate(tab, url)
+                    if error is not None:
+                        idle_tabs.append(tab)
+                        yield TabResult(url, error=error)
+                    else:
+                        active[tab] = _Navigation(url, monotonic())
+                if not active:
+                    break
+
+                finished = False
+                for tab, navigation in list(active.items()):
+                    ready = self._is_loaded(tab)
+                    timed_out = not ready and monotonic() - navigation.started > self.timeout
+                    if not (ready or timed_out):
+                        continue
+                    del active[tab]
+                    finished = True
+                    if timed_out:
+                        self._stop_loading(tab)
+                        result: TabResult[T] = TabResult(navigation.url, error=TimeoutException(
+                            f'Timeout {self.timeout}(s) expired loading "{navigation.url}"'))
+                    else:
+                        result = self._process(tab, worker, navigation)
+                    result.elapsed = monotonic() - navigation.started
+                    idle_tabs.append(tab)
+                    yield result
+                if not finished:
+                    sleep(self.poll_interval)
+        finally:
+            for tab, session_id in self._sessions.items():
+                try:
+                    connection.execute('Target.detachFromTarget', {'sessionId': session_id})
+                except Exception as e:
+                    log.debug(f'Cannot detach from tab {tab}: {e}')
+            self._sessions.clear()
+            for tab in opened_tabs:
+                try:
+                    connection.execute('Target.closeTarget', {'targetId': tab})
+                except Exception as e:
+                    log.debug(f'Cannot close tab {tab}: {e}')
+            browser.switch_to.window(original_tab)
+
+    def _execute(self, tab: str, method: str, params: dict[str, Any]) -> dict[str, Any]:
+        """
+        Send a CDP command to a tab over the browser connection, attaching to the tab first if needed
+        :param tab: window handle
+        :param method: command name
+        :param params: command parameters
+        :return: command result
+        """
+        connection = self.browser.cdp_connection
+        if tab not in self._sessions:
+            self._sessions[tab] = connection.execute('Target.attachToTarget',
+                                                     {'targetId': tab, 'flatten': True})['sessionId']
+        return connection.execute(method, params, self._sessions[tab])
+
+    def _navigate(self, tab: str, url: str) -> BaseException | None:
+        """
+        Start navigation in a tab without waiting for the page to load
+        :param tab: window handle
+        :param url: URL to open
+        :return: exception describing the failure or None if navigation has started
+        """
+        try:
+            self._execute(tab, 'Runtime.evaluate', {'expression': f'window.{_STALE_MARKER} = true'})
+            response = self._execute(tab, 'Page.navigate', {'url': url})
+        except Exception as e:
+            return e
+        if response.get('errorText'):
+            return RuntimeError(f'Error navigating to "{url}": {response["errorText"]}')
+        if 'loaderId' not in response:
+            # a same-document navigation (e.g. to another fragment of the page loaded in the tab) is already done
+            # and keeps the document, so the marker has to be removed for the tab to be seen as loaded
+            try:
+                self._execute(tab, 'Runtime.evaluate', {'expression': f'delete window.{_STALE_MARKER}'})
+            except Exception as e:
+                return e
+        log.debug(f'Started loading "{url}" in tab {tab}')
+        return None
+
+    def _is_loaded(self, tab: str) -> bool:
+        """
+        Check if a new document has replaced the old one in a tab and finished loading
+        :param tab: window handle
+        :return: True if the page is loaded; False while it is loading, including when the document is being
+            replaced and cannot evaluate scripts (a tab that never recovers is reported by the load timeout)
+        """
+        try:
+            response = self._execute(tab, 'Runtime.evaluate', {
+                'expression': f'!window.{_STALE_MARKER} && document.readyState === "complete"',
+                'returnByValue': True,
+            })
+        except Exception as e:
+            log.debug(f'Cannot check ready state of tab {tab}: {e}')
+            return False
+        return bool(response.get('result', {}).get('value'))
+
+    def _stop_loading(self, tab: str) -> None:
+        """
+        Stop a navigation that timed out
+        :param tab: window handle
+        """
+        try:
+            self._execute(tab, 'Page.stopLoading', {})
+        except Exception as e:
+            log.debug(f'Cannot stop loading in tab {tab}: {e}')
+
+    def _process(self, tab: str, worker: Callable[['Browser', str], T], navigation: _Navigation) -> TabResult[T]:
+        """
+        Call the worker for a loaded page
+        :param tab: window handle of the page
+        :param worker: worker callable
+        :param navigation: finished navigation
+        :return: worker result
+        """
+        # we do want to report any worker error (including failing to switch to the tab) as a result rather than
+        # stop processing the remaining URLs
+        # noinspection PyBroadException
+        try:
+            self.browser.switch_to.window(tab)
+            return TabResult(navigation.url, value=worker(self.browser, navigation.url))
+        except Exception as e:
+            log.debug(f'Worker failed for "{navigation.url}": {e}')
+            return TabResult(navigation.url, error=e)
@@ -0,0 +1,321 @@
+"""
+    Structured operation tracing: nested spans exported to a JSONL file
+
+    Every line of the trace file is a single span using OpenTelemetry (OTLP JSON) span field names. Tracing is
+    enabled by setting the BROWSER_TRACE_FILENAME environment variable.
+
+    Usage: python -m browser.tracing <trace.jsonl> [--top N]
+"""
+import argparse
+import atexit
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import time_ns
+from typing import IO, Any, Callable, Iterator, TypeVar
+
+from .logconfig import LOG_CONFIG
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+# Maximum length of string attributes taken from function arguments, e.g. scripts
+MAX_ATTRIBUTE_LENGTH = 200
+
+
+@dataclass
+class Span:
+    """
+    Single traced operation
+    """
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str = ''
+    start_time: int = field(default_factory=time_ns)
+    end_time: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = 'STATUS_CODE_UNSET'
+    status_message: str = ''
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """
+        Set a span attribute
+        :param key: attribute name
+        :param value: attribute value
+        """
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        :return: span in OTLP JSON format
+        """
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_span_id,
+            'name': self.name,
+            'kind': 'SPAN_KIND_INTERNAL',
+            'startTimeUnixNano': str(self.start_time),
+            'endTimeUnixNano': str(self.end_time),
+            'attributes': [{'key': key, 'value': _attribute_value(value)} for key, value in self.attributes.items()],
+            'status': {'code': self.status, 'message': self.status_message},
+        }
+
+
+class _NoopSpan:
+    """
+    Span returned when tracing is disabled
+    """
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """
+            Ignore the attribute.
+        """
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: ContextVar[Span | None] = ContextVar('current_span', default=None)
+
+
+def _attribute_value(value: Any) -> dict[str, Any]:
+    """
+    Convert a value into an OTLP JSON typed attribute value
+    :param value: attribute value
+    :return: typed value
+    """
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Tracer:
+    """
+    Creates spans and appends finished ones to a JSONL file
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Class constructor
+        :param path: output file
+        """
+        self.path = path
+        self.trace_id = os.urandom(16).hex()
+        self._lock = threading.Lock()
+        self._file: IO[str] | None = None
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Trace an operation as a child of the current span
+        :param name: span name
+        :param attributes: span attributes
+        :return: context manager yielding the span
+        """
+        parent = _current_span.get()
+        current = Span(name, self.trace_id, os.urandom(8).hex(), parent.span_id if parent else '',
+                       attributes=attributes)
+        token = _current_span.set(current)
+        try:
+            yield current
+            if current.status == 'STATUS_CODE_UNSET':
+                current.status = 'STATUS_CODE_OK'
+        except BaseException as e:
+            current.status = 'STATUS_CODE_ERROR'
+            current.status_message = f'{e.__class__.__name__}: {e}'
+            raise
+        finally:
+            current.end_time = time_ns()
+            _current_span.reset(token)
+            self._export(current)
+
+    def _export(self, finished: Span) -> None:
+        """
+        Append a finished span to the output file
+        :param finished: span
+        """
+        line = json.dumps(finished.to_dict()) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+                atexit.register(self.close)
+            self._file.write(line)
+
+    def close(self) -> None:
+        """
+            Flush and close the output file.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_tracer: Tracer | None = None
+_tracer_configured = False
+
+
+def get_tracer() -> Tracer | None:
+    """
+    Get the process-wide tracer
+    :return: tracer or None if tracing is disabled
+    """
+    global _tracer, _tracer_configured
+    if not _tracer_configured:
+        if LOG_CONFIG.trace_file:
+            _tracer = Tracer(LOG_CONFIG.trace_file)
+        _tracer_configured = True
+    return _tracer
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+    """
+    Trace an operation with the process-wide tracer; does nothing if tracing is disabled
+    :param name: span name
+    :param attributes: span attributes
+    :return: context manager yielding the span
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        yield _NOOP_SPAN
+        return
+    with tracer.span(name, **attributes) as current:
+        yield current
+
+
+def traced(name: str, *attribute_names: str, falsy_outcome: str = '') -> Callable[[F], F]:
+    """
+    Decorator tracing every call of a function. The span gets an 'outcome' attribute: 'ok', 'timeout' if
+    a timeout exception was raised, 'error' on any other exception, or :param falsy_outcome if set and the function
+    returned a falsy value (for functions reporting timeouts by returning None or False).
+    :param name: span name
+    :param attribute_names: names of function arguments recorded as span attributes
+    :param falsy_outcome: outcome reported for falsy results
+    :return: decorator
+    """
+
+    def decorator(function: F) -> F:
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            tracer = get_tracer()
+            if tracer is None:
+                return function(*args, **kwargs)
+            arguments = signature.bind(*args, **kwargs).arguments
+            attributes = {key: _truncate(arguments[key]) for key in attribute_names
+                          if arguments.get(key) is not None}
+            with tracer.span(name, **attributes) as current:
+                try:
+                    result = function(*args, **kwargs)
+                except Exception as e:
+                    current.set_attribute('outcome', 'timeout' if 'Timeout' in e.__class__.__name__ else 'error')
+                    raise
+                current.set_attribute('outcome', falsy_outcome if falsy_outcome and not result else 'ok')
+                return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _truncate(value: Any) -> Any:
+    """
+    Shorten long string attribute values
+    :param value: attribute value
+    :return: value, shortened to MAX_ATTRIBUTE_LENGTH characters if it is a string
+    """
+    if isinstance(value, str) and len(value) > MAX_ATTRIBUTE_LENGTH:
+        return value[:MAX_ATTRIBUTE_LENGTH] + '...'
+    return value
+
+
+def load_spans(path: str) -> list[dict[str, Any]]:
+    """
+    Load spans from a trace file
+    :param path: trace file
+    :return: spans, with 'duration' (in seconds) and flattened 'attrs' added
+    """
+    spans = []
+    with open(path, encoding='utf-8') as trace_file:
+        for line in trace_file:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            item['start'] = int(item['startTimeUnixNano'])
+            item['end'] = int(item['endTimeUnixNano'])
+            item['duration'] = (item['end'] - item['start']) / 1e9
+            item['attrs'] = {attribute['key']: next(iter(attribute['value'].values()))
+                             for attribute in item.get('attributes', [])}
+            spans.append(item)
+    return spans
+
+
+def critical_path(spans: list[dict[str, Any]], root: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Find the critical path starting at a span: the chain of children that finished last at every level
+    :param spans: all spans
+    :param root: starting span
+    :return: spans on the critical path
+    """
+    children: dict[str, list[dict[str, Any]]] = {}
+    for item in spans:
+        children.setdefault(item['parentSpanId'], []).append(item)
+    path = [root]
+    while nested := children.get(path[-1]['spanId']):
+        path.append(max(nested, key=lambda item: item['end']))
+    return path
+
+
+def _describe(item: dict[str, Any]) -> str:
+    """
+    Format a span for the report
+    :param item: span
+    :return: single line description
+    """
+    attrs = ' '.join(f'{key}={value}' for key, value in item['attrs'].items())
+    status = ' ERROR' if item['status']['code'] == 'STATUS_CODE_ERROR' else ''
+    return f'{item["duration"]:9.3f}s  {item["name"]}{status}  {attrs}'.rstrip()
+
+
+def main() -> int:
+    """
+    Print the slowest spans and the critical path of every trace in a trace file
+    :return: process exit code
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('trace_file', help='JSONL trace file')
+    parser.add_argument('--top', type=int, default=20, help='number of slowest spans to print')
+    args = parser.parse_args()
+
+    spans = load_spans(args.trace_file)
+    print(f'Slowest {args.top} spans:')
+    for item in sorted(spans, key=lambda item: item['duration'], reverse=True)[:args.top]:
+        print(f'  {_describe(item)}')
+
+    known = {item['spanId'] for item in spans}
+    roots = [item for item in spans if item['parentSpanId'] not in known]
+    for trace_id in dict.fromkeys(item['traceId'] for item in roots):
+        trace_roots = [item for item in roots if item['traceId'] == trace_id]
+        start = min(item['start'] for item in trace_roots)
+        end = max(item['end'] for item in trace_roots)
+        root = max(trace_roots, key=lambda item: item['duration'])
+        print(f'\nTrace {trace_id}: {(end - start) / 1e9:.3f}s, {len(trace_roots)} top-level spans, '
+              f'critical path of the slowest one:')
+        for depth, item in enumerate(critical_path(spans, root)):
+            print(f'  {"  " * depth}{_describe(item)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""
+    Resource watchdog recycling bloated or hung browser instances
+"""
+import concurrent.futures
+import threading
+from dataclasses import dataclass
+from enum import StrEnum
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from .log import setup_logging
+from .procstats import cpu_seconds, process_tree, rss_bytes
+
+if TYPE_CHECKING:
+    from .browser import Browser
+
+log = setup_logging(__name__)
+
+
+class WatchdogAction(StrEnum):
+    """
+    Remedy applied when a threshold is crossed
+    """
+    COLLECT_GARBAGE = 'collect-garbage'
+    CLOSE_TABS = 'close-tabs'
+    RESTART = 'restart'
+
+
+@dataclass
+class WatchdogThresholds:
+    """
+    Resource limits; None disables the check
+    """
+    # Chrome (and chromedriver) process tree resident set size
+    max_rss_mb: float | None = 2048
+    # process tree CPU usage since the previous sample, 100 means one core fully busy
+    max_cpu_percent: float | None = None
+    # JavaScript heap used by the current page
+    max_js_heap_mb: float | None = 512
+    # DOM nodes of the current page
+    max_dom_nodes: int | None = None
+    # number of open tabs
+    max_tabs: int | None = None
+    # the renderer is considered hung if it does not answer a trivial CDP command within this time, in seconds
+    hang_timeout: float | None = 60
+
+
+@dataclass
+class ResourceSample:
+    """
+    Single measurement of browser resource usage; metrics that could not be read are None
+    """
+    rss_mb: float | None = None
+    cpu_percent: float | None = None
+    js_heap_mb: float | None = None
+    dom_nodes: int | None = None
+    tabs: int | None = None
+    responsive: bool = True
+
+
+# Action taken for every exceeded threshold, by WatchdogThresholds attribute name
+DEFAULT_ACTIONS: dict[str, WatchdogAction] = {
+    'max_rss_mb': WatchdogAction.RESTART,
+    'max_cpu_percent': WatchdogAction.RESTART,
+    'max_js_heap_mb': WatchdogAction.COLLECT_GARBAGE,
+    'max_dom_nodes': WatchdogAction.RESTART,
+    'max_tabs': WatchdogAction.CLOSE_TABS,
+    'hang_timeout': WatchdogAction.RESTART,
+}
+
+# Sample attribute checked against each threshold
+_METRICS = {
+    'max_rss_mb': 'rss_mb',
+    'max_cpu_percent': 'cpu_percent',
+    'max_js_heap_mb': 'js_heap_mb',
+    'max_dom_nodes': 'dom_nodes',
+    'max_tabs': 'tabs',
+}
+
+
+class BrowserWatchdog:
+    """
+    Samples Chrome process tree RSS/CPU from /proc and page metrics from CDP 'Performance.getMetrics', and recycles
+    the browser when thresholds are crossed: forces garbage collection, closes tabs other than the current one or
+    restarts Chrome keeping the current URL and cookies.
+
+    Call check() between automation steps, or start() a background thread checking periodically. A restart
+    triggered by the background thread makes a WebDriver call blocked on a hung renderer fail, so the caller can
+    retry the step on the fresh browser.
+    """
+
+    def __init__(self, browser: 'Browser', thresholds: WatchdogThresholds | None = None,
+                 actions: dict[str, WatchdogAction] | None = None) -> None:
+        """
+        Class constructor
+        :param browser: browser to watch
+        :param thresholds: resource limits
+        :param actions: action by threshold name, overriding DEFAULT_ACTIONS
+        """
+        self.browser = browser
+        self.thresholds = thresholds or WatchdogThresholds()
+        self.actions = {**DEFAULT_ACTIONS, **(actions or {})}
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._cpu_reference: tuple[float, float] | None = None
+        self._performance_enabled = False
+        self._probe = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='watchdog probe')
+        self._pending_probe: concurrent.futures.Future[tuple[dict[str, float], int]] | None = None
+
+    def _pids(self) -> list[int]:
+        """
+        :return: ids of the browser processes
+        """
+        service = self.browser.service
+        if service is None or service.process is None:
+            return []
+        return process_tree(service.process.pid)
+
+    def _page_metrics(self) -> tuple[dict[str, float], int] | None:
+        """
+        Read page metrics through CDP and count tabs; a probe still pending from the previous sample is not sent
+        again
+        :return: metrics by name and number of tabs, or None if the browser did not answer within the hang timeout
+        """
+        if self._pending_probe is None or self._pending_probe.done():
+            self._pending_probe = self._probe.submit(self._read_metrics)
+        try:
+            return self._pending_probe.result(timeout=self.thresholds.hang_timeout)
+        except concurrent.futures.TimeoutError:
+            return None
+
+    def _read_metrics(self) -> tuple[dict[str, float], int]:
+        """
+        Run all WebDriver calls of a sample, so that none of them can block the watchdog on a hung browser
+        :return: 'Performance.getMetrics' metrics by name and number of tabs
+        """
+        browser = self.browser
+        if not self._performance_enabled:
+            browser.execute_cdp_cmd('Performance.enable', {})
+            self._performance_enabled = True
+        metrics = {str(item['name']): float(item['value'])
+                   for item in browser.execute_cdp_cmd('Performance.getMetrics', {})['metrics']}
+        tabs = len(browser.window_handles)
+        # a restart after a later hang cannot read the state from the browser
+        try:
+            browser.remember_state()
+        except Exception as e:
+            log.debug(f'Cannot record browser state: {e}')
+        return metrics, tabs
+
+    def sample(self, page_metrics: bool = True) -> ResourceSample:
+        """
+        Measure current resource usage
+        :param page_metrics: also read metrics that need a WebDriver call (JS heap, DOM nodes, tabs)
+        :return: measurement
+        """
+        result = ResourceSample()
+        pids = self._pids()
+        if pids:
+            result.rss_mb = rss_bytes(pids) / 2 ** 20
+            now, cpu = monotonic(), cpu_seconds(pids)
+            if self._cpu_reference is not None and now > self._cpu_reference[0]:
+                result.cpu_percent = 100 * (cpu - self._cpu_reference[1]) / (now - self._cpu_reference[0])
+            self._cpu_reference = (now, cpu)
+        if page_metrics:
+            try:
+                probe = self._page_metrics()
+            except Exception as e:
+                log.debug(f'Cannot read page metrics: {e}')
+                probe = {}, 0
+            if probe is None:
+                result.responsive = False
+            else:
+                metrics, tabs = probe
+                if tabs:
+                    result.tabs = tabs
+                if 'JSHeapUsedSize' in metrics:
+                    result.js_heap_mb = metrics['JSHeapUsedSize'] / 2 ** 20
+                if 'Nodes' in metrics:
+                    result.dom_nodes = int(metrics['Nodes'])
+        return result
+
+    def exceeded(self, measurement: ResourceSample) -> list[str]:
+        """
+        :param measurement: resource usage measurement
+        :return: names of the thresholds crossed
+        """
+        crossed = [name for name, metric in _METRICS.items()
+                   if getattr(self.thresholds, name) is not None and getattr(measurement, metric) is not None
+                   and getattr(measurement, metric) > getattr(self.thresholds, name)]
+        if not measurement.responsive:
+            crossed.append('hang_timeout')
+        return crossed
+
+    def check(self, page_metrics: bool = True) -> list[WatchdogAction]:
+        """
+        Sample resource usage and apply actions for the thresholds crossed. A restart makes other actions redundant,
+        so it is applied alone.
+        :param page_metrics: also check metrics that need a WebDriver call
+        :return: actions applied
+        """
+        with self._lock:
+            measurement = self.sample(page_metrics)
+            crossed = self.exceeded(measurement)
+            if not crossed:
+                return []
+            log.warning(f'Browser resource thresholds crossed: {", ".join(crossed)} ({measurement})')
+            actions = list(dict.fromkeys(self.actions[name] for name in crossed))
+            if WatchdogAction.RESTART in actions:
+                actions = [WatchdogAction.RESTART]
+            for action in actions:
+                self._apply(action, hung=not measurement.responsive)
+            return actions
+
+    def _apply(self, action: WatchdogAction, hung: bool = False) -> None:
+        """
+        Apply a single action
+        :param action: action to apply
+        :param hung: the browser did not answer within the hang timeout
+        """
+        browser = self.browser
+        log.debug(f'Watchdog action: {action}')
+        if action == WatchdogAction.COLLECT_GARBAGE:
+            browser.execute_cdp_cmd('HeapProfiler.collectGarbage', {})
+        elif action == WatchdogAction.CLOSE_TABS:
+            current = browser.current_window_handle
+            for handle in browser.window_handles:
+                if handle != current:
+                    browser.switch_to.window(handle)
+                    browser.close()
+            browser.switch_to.window(current)
+        elif action == WatchdogAction.RESTART:
+            browser.restart(hung=hung)
+            self.restarts += 1
+            self._performance_enabled = False
+            self._cpu_reference = None
+            self._pending_probe = None
+
+    def start(self, interval: float = 10.0, page_metrics: bool = True) -> None:
+        """
+        Start checking in a background thread
+        :param interval: time between checks, in seconds
+        :param page_metrics: also check metrics that need a WebDriver call; these calls wait for any command the
+            automation thread is running, so disable this to watch process tree metrics only
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def _run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.check(page_metrics)
+                except Exception as e:
+                    log.warning(f'Watchdog check failed: {e}')
+
+        self._thread = threading.Thread(target=_run, name='browser watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+            Stop the background thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -2,8 +2,13 @@
 import inspect
 import os
 from datetime import datetime
+from typing import TYPE_CHECKING
 
-from browser import Browser
+from .domsnapshot import DomSnapshotter, SnapshotMode
+from .tracing import span, traced
+
+if TYPE_CHECKING:
+    from .browser import Browser
 
 
 def _get_caller(level: int = 3) -> str:
@@ -42,13 +47,14 @@ class WebLogger:
     """
     root_dir: set[str] = set()
 
-    def __init__(self, name: str, browser: Browser):
+    def __init__(self, name: str, browser: 'Browser'):
         """
             Initialize logger instance with service name context.
         """
         self.browser = browser
         self.name = name
         self.trace_id: dict[str, int] = {}
+        self._snapshotter = DomSnapshotter() if browser.trace_snapshot_mode == SnapshotMode.DIFF else None
 
     @classmethod
     def _path_already_created(cls, subdir: str) -> bool:
@@ -99,7 +105,7 @@ class WebLogger:
         """
         if self.browser.save_trace_logs:
             filename = self._get_filename("trace", suffix)
-            self._write_logs(filename)
+            self._write_logs(filename, self._snapshotter)
 
     def _get_dir(self, level: str) -> str:
         """
@@ -128,10 +134,18 @@ class WebLogger:
         os.makedirs(subdir, exist_ok=True)
         return os.path.join(subdir, filename)
 
-    def _write_logs(self, filename: str) -> None:
+    @traced('weblogger.write_logs', 'filename')
+    def _write_logs(self, filename: str, snapshotter: DomSnapshotter | None = None) -> None:
         """
-            Generate a structured filename for the log output.
+        Save a screenshot and the page source
+        :param filename: output file name without extension
+        :param snapshotter: if provided, the page source is saved as an incremental snapshot
         """
-        self.browser.save_screenshot(f"{filename}.png")
-        with open(f"{filename}.html", "w", encoding="utf-8") as page_source_file:
-            page_source_file.write(self.browser.page_source)
+        self.browser.capture_screenshot(filename)
+        page_source = self.browser.page_source
+        with span('weblogger.write_page_source', bytes=len(page_source)):
+            if snapshotter is not None:
+                snapshotter.write(filename, page_source)
+                return
+            with open(f"{filename}.html", "w", encoding="utf-8") as page_source_file:
+                page_source_file.write(page_source)